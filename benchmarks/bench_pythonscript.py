@@ -0,0 +1,506 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Benchmarks for Python Scripts
+
+Measures compiling, loading and calling scripts.  Run it with::
+
+  tox -e benchmark
+
+or directly, where ``--save`` writes the results as the new baseline and
+``--compare`` reports the changes against a stored baseline::
+
+  python benchmarks/bench_pythonscript.py --save local.json
+  python benchmarks/bench_pythonscript.py --compare local.json
+
+Regressions are only reported; with ``--fail-on-regression`` they make
+the run fail.  The tox environment compares with
+``benchmarks/baseline.json``, other baselines can be given as arguments::
+
+  tox -e benchmark -- --compare local.json
+
+Timings are the best of several runs, in microseconds per operation.
+The ``call_800_in_*_threads`` benchmarks make the same calls from a
+growing number of threads, to show how the call path scales.
+The results of the benchmarks ending in ``_bytes`` are the memory used
+by the objects they create, in bytes.
+Baselines are only comparable when taken on the same machine.
+"""
+
+import argparse
+import atexit
+import contextlib
+import json
+import pickle
+import shutil
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from AccessControl.SecurityManagement import newSecurityManager
+from AccessControl.SecurityManagement import noSecurityManager
+from AccessControl.SpecialUsers import system
+from AccessControl.ZopeGuards import guarded_getattr
+from App.config import getConfiguration
+from OFS.Cache import Cache
+from OFS.Cache import CacheManager
+from OFS.Folder import Folder
+from OFS.SimpleItem import SimpleItem
+from Testing.makerequest import makerequest
+
+from Products.PythonScripts import recompile
+from Products.PythonScripts.PythonScript import PythonScript
+from Products.PythonScripts.standard import DTML
+from Products.PythonScripts.standard import Object
+from Products.PythonScripts.standard import Records
+
+
+_benchmarks = []
+_memory_benchmarks = []
+
+
+def benchmark(name):
+    """Register a benchmark.
+
+    The decorated function does the setup and returns the function to
+    be timed.
+    """
+    def register(setup):
+        _benchmarks.append((name, setup))
+        return setup
+    return register
+
+
+def memory_benchmark(name):
+    """Register a memory benchmark.
+
+    The decorated function does the setup and returns a function whose
+    result is measured, in bytes.
+    """
+    def register(setup):
+        _memory_benchmarks.append((name, setup))
+        return setup
+    return register
+
+
+@contextlib.contextmanager
+def product_config(**settings):
+    config = getConfiguration()
+    old = getattr(config, 'product_config', None)
+    config.product_config = {'pythonscripts': settings}
+    try:
+        yield
+    finally:
+        config.product_config = old
+
+
+class DictCache(Cache):
+
+    def __init__(self):
+        self.data = {}
+
+    def ZCache_get(self, ob, view_name, keywords, mtime_func, default):
+        return self.data.get(repr(sorted(keywords.items())), default)
+
+    def ZCache_set(self, ob, data, view_name, keywords, mtime_func):
+        self.data[repr(sorted(keywords.items()))] = data
+
+    def ZCache_invalidate(self, ob):
+        self.data.clear()
+
+
+class DictCacheManager(CacheManager, SimpleItem):
+
+    _isCacheManager = 1
+
+    def __init__(self, id):
+        self.id = id
+        self.cache = DictCache()
+
+    def ZCacheManager_getCache(self):
+        return self.cache
+
+
+def makeBody(lines):
+    body = ['result = []']
+    for i in range(lines - 2):
+        body.append(f'result.append("{i}".zfill(3) + str({i} * 2))')
+    body.append('return result')
+    return '\n'.join(body)
+
+
+class Root(Folder):
+
+    def getPhysicalPath(self):
+        return ('',)
+
+
+def makeFolder():
+    root = makerequest(Root('root'))
+    root._setObject('folder', Folder('folder'))
+    folder = root._getOb('folder')
+    folder._setObject('cache', DictCacheManager('cache'))
+    return folder
+
+
+def makeScript(body, id='ps', folder=None, bind=None):
+    ps = PythonScript(id)
+    if bind is not None:
+        ps.ZBindings_edit(bind)
+    ps.write(body)
+    if folder is not None:
+        folder._setObject(id, ps)
+        ps = folder._getOb(id)
+    return ps
+
+
+def _compile(lines):
+    ps = makeScript(makeBody(lines), bind={})
+    return ps._compile
+
+
+for _lines in (10, 100, 1000):
+    benchmark(f'compile_{_lines}_lines')(
+        lambda _lines=_lines: _compile(_lines))
+
+
+@benchmark('compile_100_lines_bytecode_cache')
+def compile_cached():
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory)
+    settings = {'bytecode-cache-dir': directory}
+    with product_config(**settings):
+        ps = makeScript(makeBody(100), bind={})
+
+    def run():
+        with product_config(**settings):
+            ps._compile()
+    return run
+
+
+@benchmark('unpickle_and_materialize')
+def unpickle():
+    data = pickle.dumps(makeScript(makeBody(100), bind={}))
+    return lambda: pickle.loads(data)
+
+
+@benchmark('call_without_bindings')
+def call_without_bindings():
+    return makeScript('return 1', bind={})
+
+
+@benchmark('call_with_bindings')
+def call_with_bindings():
+    ps = makeScript('return context, container, script', folder=makeFolder())
+    return ps
+
+
+@benchmark('call_cached')
+def call_cached():
+    ps = makeScript('##parameters=x\nreturn x', folder=makeFolder())
+    ps.ZCacheable_setManagerId('cache')
+    ps(1)
+    return lambda: ps(1)
+
+
+@benchmark('call_uncached_with_cache_manager')
+def call_uncached():
+    ps = makeScript('##parameters=x\nreturn x', folder=makeFolder())
+    ps.ZCacheable_setManagerId('cache')
+    ps.ZCacheable_setEnabled(0)
+    return lambda: ps(1)
+
+
+@benchmark('batch_100_calls')
+def batch():
+    ps = makeScript('##parameters=x\nreturn x * 2', folder=makeFolder())
+    argsets = [((i,), {}) for i in range(100)]
+    return lambda: list(ps.batch(argsets))
+
+
+@benchmark('read')
+def read():
+    return makeScript(makeBody(100), bind={}).read
+
+
+@benchmark('get_size')
+def get_size():
+    return makeScript(makeBody(100), bind={}).get_size
+
+
+@benchmark('recompile_100_scripts')
+def recompile_scripts():
+    folder = makeFolder()
+    for i in range(100):
+        makeScript(makeBody(10), id=f'ps{i}', folder=folder, bind={})
+    scripts = folder.objectValues('Script (Python)')
+
+    def run():
+        for ps in scripts:
+            ps._v_change = 1
+        recompile(folder)
+    return run
+
+
+_loop_body = '''\
+total = 0
+d = {"a": 1, "b": 2}
+for i in range(100):
+    for k in ["a", "b"]:
+        total += d[k]
+return total
+'''
+
+
+@benchmark('loop_guards')
+def loop_guards():
+    return makeScript(_loop_body, bind={})
+
+
+@benchmark('loop_guards_optimized')
+def loop_guards_optimized():
+    with product_config(**{'optimize-guards': 'on'}):
+        return makeScript(_loop_body, bind={})
+
+
+_string_body = '''\
+##parameters=words
+result = []
+for word in words:
+    word = word.strip().lower()
+    if word.startswith('x') or word.endswith('y'):
+        continue
+    result.append(word.replace('a', 'b').capitalize())
+return ', '.join(result)
+'''
+
+
+@benchmark('string_processing')
+def string_processing():
+    ps = makeScript(_string_body, bind={})
+    words = [f' Word{i} ' for i in range(100)]
+    return lambda: ps(words)
+
+
+@benchmark('string_processing_full_getattr_guard')
+def string_processing_full_guard():
+    ps = makeScript(_string_body, bind={})
+    ps._v_ft[1]['_getattr_'] = guarded_getattr
+    words = [f' Word{i} ' for i in range(100)]
+    return lambda: ps(words)
+
+
+@benchmark('dtml_create_and_render')
+def dtml_create_and_render():
+    source = ('<dtml-in items><dtml-var sequence-item html_quote>'
+              '<dtml-unless sequence-end>, </dtml-unless></dtml-in>')
+    items = list(range(10))
+    return lambda: DTML(source)(items=items)
+
+
+_records_body = """\
+##parameters=rows
+from Products.PythonScripts.standard import %s
+return %s
+"""
+_rows = [{'id': i, 'title': f'Item {i}', 'price': i * 1.5}
+         for i in range(1000)]
+
+
+@benchmark('object_1000_records')
+def object_records():
+    ps = makeScript(_records_body % (
+        'Object', '[Object(**row) for row in rows]'), bind={})
+    return lambda: ps(_rows)
+
+
+@benchmark('records_1000_records')
+def records_records():
+    ps = makeScript(_records_body % (
+        'Records', 'Records(("id", "title", "price"), rows)'), bind={})
+    return lambda: ps(_rows)
+
+
+@memory_benchmark('object_1000_records_bytes')
+def object_records_memory():
+    return lambda: [Object(**row) for row in _rows]
+
+
+@memory_benchmark('records_1000_records_bytes')
+def records_records_memory():
+    return lambda: Records(('id', 'title', 'price'), _rows)
+
+
+_format_body = """\
+##parameters=values
+from Products.PythonScripts.standard import html_quote
+from Products.PythonScripts.standard import html_quote_each
+from Products.PythonScripts.standard import thousands_commas
+from Products.PythonScripts.standard import thousands_commas_each
+return %s
+"""
+_numbers = list(range(0, 10000000, 10000))
+_strings = [f'<b>Item {i} & more</b>' for i in range(1000)]
+
+
+@benchmark('thousands_commas_1000_values')
+def thousands_commas_single():
+    ps = makeScript(_format_body % '[thousands_commas(v) for v in values]',
+                    bind={})
+    return lambda: ps(_numbers)
+
+
+@benchmark('thousands_commas_each_1000_values')
+def thousands_commas_each():
+    ps = makeScript(_format_body % 'thousands_commas_each(values)', bind={})
+    return lambda: ps(_numbers)
+
+
+@benchmark('html_quote_1000_values')
+def html_quote_single():
+    ps = makeScript(_format_body % '[html_quote(v) for v in values]',
+                    bind={})
+    return lambda: ps(_strings)
+
+
+@benchmark('html_quote_each_1000_values')
+def html_quote_each():
+    ps = makeScript(_format_body % 'html_quote_each(values)', bind={})
+    return lambda: ps(_strings)
+
+
+_json_body = """\
+##parameters=rows
+from Products.PythonScripts.standard import json_dumps
+return %s
+"""
+_json_hand_built = (
+    "'[%s]' % ', '.join(['{\"id\": %d, \"title\": \"%s\", "
+    "\"price\": %r}' % (row['id'], row['title'].replace('\"', '\\\\\"'), "
+    "row['price']) for row in rows])")
+
+
+@benchmark('json_hand_built_1000_rows')
+def json_hand_built():
+    ps = makeScript(_json_body % _json_hand_built, bind={})
+    return lambda: ps(_rows)
+
+
+@benchmark('json_dumps_1000_rows')
+def json_dumps():
+    ps = makeScript(_json_body % 'json_dumps(rows)', bind={})
+    return lambda: ps(_rows)
+
+
+def _call_in_threads(threads, calls=800):
+    folder = makeFolder()
+    ps = makeScript('return context.getId(), container, script',
+                    folder=folder)
+    executor = ThreadPoolExecutor(threads)
+    atexit.register(executor.shutdown)
+
+    def work(count):
+        for i in range(count):
+            ps()
+
+    def run():
+        futures = [executor.submit(work, calls // threads)
+                   for i in range(threads)]
+        for future in futures:
+            future.result()
+    return run
+
+
+for _threads in (1, 2, 4, 8):
+    benchmark(f'call_800_in_{_threads}_threads')(
+        lambda _threads=_threads: _call_in_threads(_threads))
+
+
+def run(names=None, repeat=5):
+    results = {}
+    newSecurityManager(None, system)
+    try:
+        for name, setup in _benchmarks:
+            if names and name not in names:
+                continue
+            timer = timeit.Timer(setup())
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat, number)) / number
+            results[name] = round(best * 1e6, 3)
+        for name, setup in _memory_benchmarks:
+            if names and name not in names:
+                continue
+            make = setup()
+            make()
+            tracemalloc.start()
+            try:
+                objects = make()
+                results[name] = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            del objects
+    finally:
+        noSecurityManager()
+    return results
+
+
+def report(results, baseline=None, threshold=1.25):
+    """Print the results and return the names of the regressions."""
+    regressions = []
+    width = max(len(name) for name in results)
+    print(f'{"benchmark":<{width}}  {"baseline":>10}  {"current":>10}  '
+          f'{"ratio":>6}')
+    for name, current in results.items():
+        line = f'{name:<{width}}  '
+        previous = (baseline or {}).get(name)
+        if previous:
+            ratio = current / previous
+            line += f'{previous:>10.3f}  {current:>10.3f}  {ratio:>6.2f}'
+            if ratio > threshold:
+                regressions.append(name)
+                line += '  REGRESSION'
+        else:
+            line += f'{"-":>10}  {current:>10.3f}'
+        print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', metavar='FILE',
+                        help='store the results as baseline in FILE')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare the results with the baseline in FILE')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio reported as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='exit with status 1 if there are regressions')
+    parser.add_argument('names', nargs='*', help='only run these benchmarks')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    results = run(args.names)
+    regressions = report(results, baseline, args.threshold)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,8 +16,10 @@ This product provides support for Script objects containing restricted
 Python code.
 """
 
+import ast
 import importlib.abc
 import importlib.util
+import inspect
 import linecache
 import marshal
 import os
@@ -25,6 +27,7 @@ import re
 import sys
 import types
 from logging import getLogger
+from time import perf_counter
 from urllib.parse import quote
 
 from AccessControl.class_init import InitializeClass
@@ -34,23 +37,40 @@ from AccessControl.Permissions import view_management_screens
 from AccessControl.requestmethod import requestmethod
 from AccessControl.SecurityInfo import ClassSecurityInfo
 from AccessControl.SecurityManagement import getSecurityManager
+from AccessControl.unauthorized import Unauthorized
 from AccessControl.ZopeGuards import get_safe_globals
-from AccessControl.ZopeGuards import guarded_getattr
 from Acquisition import aq_parent
 from App.Common import package_home
 from App.special_dtml import DTMLFile
 from OFS.Cache import Cacheable
 from OFS.History import Historical
-from OFS.History import html_diff
 from OFS.SimpleItem import SimpleItem
+from RestrictedPython import RestrictingNodeTransformer
 from RestrictedPython import compile_restricted_function
 from Shared.DC.Scripts.Script import BindingsUI
 from Shared.DC.Scripts.Script import Script
 from Shared.DC.Scripts.Script import defaultBindings
+from zExceptions import BadRequest
 from zExceptions import Forbidden
 from zExceptions import ResourceLockedError
+from ZPublisher.BaseRequest import BaseRequest
 from ZPublisher.HTTPRequest import default_encoding
 
+from . import bytecodecache
+from . import compilequeue
+from . import historydiff
+from . import instrumentation
+from . import metrics
+from . import slowlog
+from . import tracing
+from .analyzer import analyze
+from .config import getBoolSetting
+from .config import getIntSetting
+from .guards import fast_guarded_getattr
+from .indexing import contentHash
+from .indexing import titledHash
+from .optimizer import OptimizingNodeTransformer
+
 
 LOG = getLogger('PythonScripts')
 
@@ -122,7 +142,13 @@ class PythonScript(Script, Historical, Cacheable):
     _proxy_roles = ()
 
     _params = _body = ''
-    errors = warnings = ()
+    errors = warnings = performance_warnings = ()
+    slow_call_threshold = 0
+    compile_time = ast_size = 0
+    compile_pending = False
+    # ((name, kind, repr of the default or None), ...) of the parameters
+    _signature = None
+    _content_hash = None
     _v_change = 0
 
     manage_options = (
@@ -174,6 +200,18 @@ class PythonScript(Script, Historical, Cacheable):
             self.title = title
             self.ZCacheable_invalidate()
 
+    @security.protected(change_python_scripts)
+    def ZPythonScript_setSlowCallThreshold(self, threshold):
+        """Log calls taking longer than threshold milliseconds.
+
+        A threshold of 0 uses the ``slow-call-threshold`` of the product
+        configuration.
+        """
+        threshold = float(threshold or 0)
+        if threshold < 0:
+            raise ValueError('The threshold must not be negative.')
+        self.slow_call_threshold = threshold
+
     @security.protected(change_python_scripts)
     def ZPythonScript_edit(self, params, body):
         self._validateProxy()
@@ -207,6 +245,10 @@ class PythonScript(Script, Historical, Cacheable):
 
     def ZScriptHTML_tryParams(self):
         """Parameters to test the script with."""
+        signature = self._getSignature()
+        if signature is not None:
+            return [name for name, kind, default in signature
+                    if kind not in ('VAR_POSITIONAL', 'VAR_KEYWORD')]
         param_names = []
         for name in self._params.split(','):
 
@@ -215,12 +257,38 @@ class PythonScript(Script, Historical, Cacheable):
                 param_names.append(name.split('=', 1)[0].strip())
         return param_names
 
+    def _getSignature(self):
+        signature = self._signature
+        if signature is None and self._code is not None and \
+           getattr(self, '_v_ft', None) is not None:
+            # Compiled before the signature was recorded.  The defaults
+            # of keyword-only parameters are not known.
+            code, safe_globals, defaults = self._v_ft
+            signature = _signatureOf(
+                types.FunctionType(code, {}, None, defaults))
+        return signature
+
+    @security.protected(view_management_screens)
+    def signature(self):
+        """Return the parameters of the compiled script.
+
+        Each parameter is a mapping with its name, its kind as named by
+        ``inspect.Parameter``, e.g. ``POSITIONAL_OR_KEYWORD``, and the
+        repr of its default value, or None if it has none.  Return None
+        if the script has errors.
+        """
+        signature = self._getSignature()
+        if signature is None:
+            return None
+        return [{'name': name, 'kind': kind, 'default': default}
+                for name, kind, default in signature]
+
     @security.protected(view_management_screens)
     def manage_historyCompare(self, rev1, rev2, REQUEST,
                               historyComparisonResults=''):
         return PythonScript.inheritedAttribute('manage_historyCompare')(
             self, rev1, rev2, REQUEST,
-            historyComparisonResults=html_diff(rev1.read(), rev2.read()))
+            historyComparisonResults=historydiff.html_diff(rev1, rev2))
 
     def __setstate__(self, state):
         Script.__setstate__(self, state)
@@ -242,21 +310,65 @@ class PythonScript(Script, Historical, Cacheable):
             self._newfun(marshal.loads(self._code))
 
     def _compile(self):
-        bind_names = self.getBindingAssignments().getAssignedNamesInOrder()
+        asgns = self.getBindingAssignments()
+        bind_names = asgns.getAssignedNamesInOrder()
+        filename = self._getFilepath()
+        if metrics.enabled:
+            metrics.recordCompile(filename)
+        if self.compile_pending:
+            self.compile_pending = False
+        policy = _policy()
+        find_slow_code = getBoolSetting('performance-warnings', True)
+        start = perf_counter()
+
+        cache = bytecodecache.getCache()
+        if cache is not None:
+            cache_key = cache.key(
+                Python_magic, Script_magic, policy.__name__, find_slow_code,
+                filename, self.id, self._params, bind_names, self._body)
+            entry = cache.get(cache_key)
+            if entry is not None:
+                (code_data, self.warnings, self.performance_warnings,
+                 self.ast_size) = entry
+                self.compile_time = perf_counter() - start
+                self._setCode(code_data)
+                return
+
+        body = self._body or 'pass'
+        performance_warnings = ()
+        ast_size = 0
+        try:
+            body = ast.parse(body, '<func code>', 'exec')
+        except SyntaxError:
+            # Let RestrictedPython report the error.
+            pass
+        else:
+            ast_size = sum(1 for node in ast.walk(body))
+            if find_slow_code:
+                script_names = [
+                    asgns.getAssignedName(name, '')
+                    for name in ('name_context', 'name_container')]
+                performance_warnings = analyze(body, script_names)
         compile_result = compile_restricted_function(
             self._params,
-            body=self._body or 'pass',
+            body=body,
             name=self.id,
-            filename=getattr(self, '_filepath', None) or self.get_filepath(),
-            globalize=bind_names)
+            filename=filename,
+            globalize=bind_names,
+            policy=policy)
 
         code = compile_result.code
         errors = compile_result.errors
         self.warnings = tuple(compile_result.warnings)
+        self.performance_warnings = performance_warnings
+        self.compile_time = perf_counter() - start
+        self.ast_size = ast_size
         if errors:
             self._code = None
             self._v_ft = None
+            self._v_names = None
             self._setFuncSignature((), (), 0)
+            self._signature = None
             # Fix up syntax errors.
             filestring = '  File "<string>",'
             for i in range(len(errors)):
@@ -266,12 +378,22 @@ class PythonScript(Script, Historical, Cacheable):
             self.errors = errors
             return
 
-        self._code = marshal.dumps(code)
+        code_data = marshal.dumps(code)
+        if cache is not None:
+            cache.set(cache_key, (code_data, self.warnings,
+                                  performance_warnings, ast_size))
+        self._setCode(code_data, code)
+
+    def _setCode(self, code_data, code=None):
+        if code is None:
+            code = marshal.loads(code_data)
+        self._code = code_data
         self.errors = ()
         f = self._newfun(code)
         fc = f.__code__
         self._setFuncSignature(f.__defaults__, fc.co_varnames,
                                fc.co_argcount)
+        self._signature = _signatureOf(f)
         self.Python_magic = Python_magic
         self.Script_magic = Script_magic
         linecache.clearcache()
@@ -279,7 +401,7 @@ class PythonScript(Script, Historical, Cacheable):
 
     def _newfun(self, code):
         safe_globals = get_safe_globals()
-        safe_globals['_getattr_'] = guarded_getattr
+        safe_globals['_getattr_'] = fast_guarded_getattr
         safe_globals['__debug__'] = __debug__
         # it doesn't really matter what __name__ is, *but*
         # - we need a __name__
@@ -294,8 +416,33 @@ class PythonScript(Script, Historical, Cacheable):
         exec(code, safe_globals, safe_locals)
         func = list(safe_locals.values())[0]
         self._v_ft = (func.__code__, safe_globals, func.__defaults__ or ())
+        self._v_names = _referencedNames(func.__code__)
+        # The bind code depends on the names used by the code.
+        try:
+            del self._v_bindcode
+        except AttributeError:
+            pass
         return func
 
+    def _createBindCode(self, names):
+        # Only compute the bindings the code refers to, computing some of
+        # them (namespace, subpath) is expensive.  All assigned names are
+        # still removed from the keyword arguments.
+        used = getattr(self, '_v_names', None)
+        if used is None:
+            return names._createCodeBlockForMapping()
+        asgns = names.getAssignedNames()
+        exprtext = []
+        assigned_names = []
+        for name, expr in names._exprs:
+            if name in asgns:
+                assigned_name = asgns[name]
+                assigned_names.append(assigned_name)
+                if assigned_name in used:
+                    exprtext.append(f'"{assigned_name}":{expr},')
+        return names._generateCodeBlock(
+            '{%s}' % ''.join(exprtext), assigned_names)
+
     def _makeFunction(self):
         self.ZCacheable_invalidate()
         self._compile()
@@ -313,28 +460,62 @@ class PythonScript(Script, Historical, Cacheable):
         Calling a Python Script is an actual function invocation.
         """
         # Retrieve the value from the cache.
-        keyset = None
-        if self.ZCacheable_isCachingEnabled():
-            # Prepare a cache key.
-            keyset = kw.copy()
-            asgns = self.getBindingAssignments()
-            name_context = asgns.getAssignedName('name_context', None)
-            if name_context:
-                keyset[name_context] = aq_parent(self).getPhysicalPath()
-            name_subpath = asgns.getAssignedName('name_subpath', None)
-            if name_subpath:
-                keyset[name_subpath] = self._getTraverseSubpath()
-            # Note: perhaps we should cache based on name_ns also.
-            keyset['*'] = args
-            result = self.ZCacheable_get(keywords=keyset, default=_marker)
+        keyset = self._getCacheKeyset(args, kw)
+        if keyset is not None:
+            result = self._getCached(keyset)
             if result is not _marker:
                 # Got a cached value.
                 return result
 
+        function = self._newFunction(bound_names)
+        return self._callFunction(function, args, kw, keyset)
+
+    def _getCacheKeyset(self, args, kw):
+        if not self.ZCacheable_isCachingEnabled():
+            return None
+        # Prepare a cache key.
+        keyset = kw.copy()
+        asgns = self.getBindingAssignments()
+        name_context = asgns.getAssignedName('name_context', None)
+        if name_context:
+            keyset[name_context] = aq_parent(self).getPhysicalPath()
+        name_subpath = asgns.getAssignedName('name_subpath', None)
+        if name_subpath:
+            keyset[name_subpath] = self._getTraverseSubpath()
+        # Note: perhaps we should cache based on name_ns also.
+        keyset['*'] = args
+        return keyset
+
+    def _getCached(self, keyset):
+        result = self.ZCacheable_get(keywords=keyset, default=_marker)
+        if metrics.enabled:
+            metrics.recordCacheLookup(self._getFilepath(),
+                                      result is not _marker)
+        return result
+
+    def _getFilepath(self):
+        return getattr(self, '_filepath', None) or self.get_filepath()
+
+    def _getBoundNames(self, kw, caller_namespace=None):
+        # Compute the bound names the way Bindings._bindAndExec does,
+        # without executing the script.
+        bindcode = getattr(self, '_v_bindcode', _marker)
+        if bindcode is _marker:
+            bindcode = self._prepareBindCode()
+        if bindcode is None:
+            return {}
+        bound_data = []
+        exec(bindcode)
+        return bound_data[0]
+
+    def _newFunction(self, bound_names):
         ft = self._v_ft
         if ft is None:
             __traceback_supplement__ = (
                 PythonScriptTracebackSupplement, self)
+            if self.compile_pending:
+                raise RuntimeError(
+                    f'{self.meta_type} {self.id} is not compiled yet.')
             raise RuntimeError(f'{self.meta_type} {self.id} has errors.')
 
         function_code, safe_globals, function_argument_definitions = ft
@@ -343,24 +524,82 @@ class PythonScript(Script, Historical, Cacheable):
             safe_globals.update(bound_names)
         safe_globals['__traceback_supplement__'] = (
             PythonScriptTracebackSupplement, self, -1)
-        safe_globals['__file__'] = getattr(
-            self, '_filepath', None) or self.get_filepath()
+        safe_globals['__file__'] = self._getFilepath()
         safe_globals['__loader__'] = PythonScriptLoader(self._body)
+        if instrumentation.enabled:
+            instrumentation.instrument(safe_globals)
 
-        function = types.FunctionType(
+        return types.FunctionType(
             function_code, safe_globals, None, function_argument_definitions)
 
-        try:
-            result = function(*args, **kw)
-        except SystemExit:
-            raise ValueError(
-                'SystemExit cannot be raised within a PythonScript')
+    def _callFunction(self, function, args, kw, keyset=None):
+        threshold = slowlog.getThreshold(self)
+        if threshold is None and not metrics.enabled:
+            result = self._runFunction(function, args, kw)
+        else:
+            start = perf_counter()
+            failed = True
+            try:
+                result = self._runFunction(function, args, kw)
+                failed = False
+            finally:
+                elapsed = perf_counter() - start
+                if metrics.enabled:
+                    metrics.recordCall(self._getFilepath(), elapsed, failed)
+                if threshold is not None and elapsed > threshold:
+                    slowlog.logSlowCall(LOG, self, elapsed, args, kw)
 
         if keyset is not None:
             # Store the result in the cache.
             self.ZCacheable_set(result, keywords=keyset)
         return result
 
+    def _runFunction(self, function, args, kw):
+        try:
+            if tracing.enabled:
+                with tracing.trace('/'.join(self.getPhysicalPath())):
+                    return function(*args, **kw)
+            return function(*args, **kw)
+        except SystemExit:
+            raise ValueError(
+                'SystemExit cannot be raised within a PythonScript')
+
+    @security.protected('View')
+    def batch(self, argsets):
+        """Call the script once for each ``(args, kw)`` pair in argsets.
+
+        Bindings and globals are prepared only once for the whole batch.
+        The results are returned lazily by a generator, in the order of
+        argsets.
+        """
+        security = getSecurityManager()
+        security.addContext(self)
+        try:
+            bound_names = self._getBoundNames({})
+            function = self._newFunction(bound_names)
+        finally:
+            security.removeContext(self)
+        assigned_names = frozenset(
+            self.getBindingAssignments().getAssignedNamesInOrder())
+        return self._batch(function, assigned_names, argsets)
+
+    def _batch(self, function, assigned_names, argsets):
+        for args, kw in argsets:
+            # Bound names win over keyword arguments, as in a normal call.
+            kw = {k: v for k, v in kw.items() if k not in assigned_names}
+            keyset = self._getCacheKeyset(args, kw)
+            result = _marker
+            if keyset is not None:
+                result = self._getCached(keyset)
+            if result is _marker:
+                security = getSecurityManager()
+                security.addContext(self)
+                try:
+                    result = self._callFunction(function, args, kw, keyset)
+                finally:
+                    security.removeContext(self)
+            yield result
+
     def manage_afterAdd(self, item, container):
         if item is self:
             self._filepath = self.get_filepath()
@@ -386,13 +625,38 @@ class PythonScript(Script, Historical, Cacheable):
         if not roles:
             return
         user = getSecurityManager().getUser()
-        if user is not None and user.allowed(self, roles):
+        if user is not None and self._proxyAllowed(user, tuple(roles)):
             return
         raise Forbidden(
             'You are not authorized to change <em>%s</em> '
             'because you do not have proxy roles.\n<!--%s, %s-->' % (
                 self.id, user, roles))
 
+    def _proxyAllowed(self, user, roles):
+        # The results are kept for the rest of the request, as syncing
+        # many Scripts checks the same roles over and over.  They are
+        # kept per Script, which may have local roles of its own.
+        request = getattr(self, 'REQUEST', None)
+        if not isinstance(request, BaseRequest):
+            return user.allowed(self, roles)
+        memo = request.__dict__.get('_proxy_allowed')
+        if memo is None:
+            memo = request._proxy_allowed = {}
+        # The user is kept with the result so that its id is not reused.
+        key = (id(user), roles, self.getPhysicalPath())
+        try:
+            return memo[key][1]
+        except KeyError:
+            allowed = bool(user.allowed(self, roles))
+            memo[key] = (user, allowed)
+            return allowed
+
+    def _checkProxyChange(self, user, roles):
+        # Raise unless user may give the Script roles instead of its own.
+        if 'Manager' not in user.getRolesInContext(self):
+            self._validateProxy(roles)
+            self._validateProxy()
+
     security.declareProtected(change_proxy_roles,  # NOQA: D001
                               'manage_proxyForm')
 
@@ -402,10 +666,7 @@ class PythonScript(Script, Historical, Cacheable):
     @requestmethod('POST')
     def manage_proxy(self, roles=(), REQUEST=None):
         """Change Proxy Roles"""
-        user = getSecurityManager().getUser()
-        if 'Manager' not in user.getRolesInContext(self):
-            self._validateProxy(roles)
-            self._validateProxy()
+        self._checkProxyChange(getSecurityManager().getUser(), roles)
         self.ZCacheable_invalidate()
         self._proxy_roles = tuple(roles)
         if REQUEST:
@@ -424,7 +685,12 @@ class PythonScript(Script, Historical, Cacheable):
         self.dav__init(REQUEST, RESPONSE)
         self.dav__simpleifhandler(REQUEST, RESPONSE, refresh=1)
         new_body = REQUEST.get('BODY', '')
-        self.write(new_body)
+        if getBoolSetting('background-compile'):
+            self._validateProxy()
+            self._write(new_body, defer=True)
+            compilequeue.schedule(self)
+        else:
+            self.write(new_body)
         RESPONSE.setStatus(204)
         return RESPONSE
 
@@ -434,43 +700,60 @@ class PythonScript(Script, Historical, Cacheable):
     def write(self, text):
         """ Change the Script by parsing a read()-style source text. """
         self._validateProxy()
+        self._write(text)
+
+    def _write(self, text, defer=False):
+        # With defer the Script is only marked for compilation.
         mdata = self._metadata_map()
         bindmap = self.getBindingAssignments().getAssignedNames()
         bup = 0
+        changes = {}
 
         if isinstance(text, bytes):
             text = text.decode(default_encoding)
 
         st = 0
+        while 1:
+            # Find the next non-empty line
+            m = _nonempty_line.search(text, st)
+            if not m:
+                # There were no non-empty body lines
+                body = ''
+                break
+            line = m.group(0).strip()
+            if line[:2] != '##':
+                # We have found the first line of the body
+                body = text[m.start(0):]
+                break
+
+            st = m.end(0)
+            # Parse this header line
+            if len(line) == 2 or line[2] == ' ' or '=' not in line:
+                # Null header line
+                continue
+            k, v = line[2:].split('=', 1)
+            k = k.strip().lower()
+            v = v.strip()
+            if k not in mdata:
+                raise SyntaxError('Unrecognized header line "%s"' % line)
+            if v == mdata[k]:
+                # Unchanged value
+                continue
+            changes[k] = v
+
+        body = body.rstrip()
+        if body:
+            body = body + '\n'
+        max_size = getIntSetting('max-body-size')
+        if max_size and len(body) > max_size:
+            # Rejected before anything is changed.
+            raise BadRequest(
+                f'The body of {self.id} has {len(body)} characters, '
+                f'more than the {max_size} characters allowed.')
+
         try:
-            while 1:
-                # Find the next non-empty line
-                m = _nonempty_line.search(text, st)
-                if not m:
-                    # There were no non-empty body lines
-                    body = ''
-                    break
-                line = m.group(0).strip()
-                if line[:2] != '##':
-                    # We have found the first line of the body
-                    body = text[m.start(0):]
-                    break
-
-                st = m.end(0)
-                # Parse this header line
-                if len(line) == 2 or line[2] == ' ' or '=' not in line:
-                    # Null header line
-                    continue
-                k, v = line[2:].split('=', 1)
-                k = k.strip().lower()
-                v = v.strip()
-                if k not in mdata:
-                    raise SyntaxError('Unrecognized header line "%s"' % line)
-                if v == mdata[k]:
-                    # Unchanged value
-                    continue
-
-                # Set metadata value
+            # Set metadata values
+            for k, v in changes.items():
                 if k == 'title':
                     self.title = v
                 elif k == 'parameters':
@@ -479,14 +762,22 @@ class PythonScript(Script, Historical, Cacheable):
                     bindmap[_nice_bind_names[k[5:]]] = v
                     bup = 1
 
-            body = body.rstrip()
-            if body:
-                body = body + '\n'
             if body != self._body:
                 self._body = body
+            content_hash = contentHash(self._params, self._body)
+            if content_hash != self._content_hash:
+                self._content_hash = content_hash
+            if defer:
+                self._code = None
+                self._v_ft = None
+                self._signature = None
+                self.errors = self.warnings = ()
+                self.performance_warnings = ()
+                self.compile_pending = True
+                self.ZCacheable_invalidate()
             if bup:
                 self.ZBindings_edit(bindmap)
-            else:
+            elif not defer:
                 self._makeFunction()
         except Exception:
             LOG.error('write failed', exc_info=sys.exc_info())
@@ -537,6 +828,11 @@ class PythonScript(Script, Historical, Cacheable):
             hlines.append(' Warnings:')
             for line in self.warnings:
                 hlines.append('  ' + line)
+        threshold = getIntSetting('slow-compile-threshold', 1000)
+        if self.compile_time * 1000 > threshold:
+            hlines.append('')
+            hlines.append(f' Compiled in {self.compile_time * 1000:.0f} ms, '
+                          f'{self.ast_size} syntax tree nodes.')
         hlines.append('')
         return ('\n' + prefix).join(hlines) + '\n' + self._body
 
@@ -558,6 +854,16 @@ class PythonScript(Script, Historical, Cacheable):
         """Support for searching - the document's contents are searched."""
         return f'{self._params}\n{self._body}'
 
+    @security.protected(view_management_screens)
+    def content_hash(self):
+        """Return a digest of the title and of the source returned by
+        PrincipiaSearchSource.
+        """
+        source_hash = self._content_hash
+        if source_hash is None:
+            source_hash = contentHash(self._params, self._body)
+        return titledHash(self.title, source_hash)
+
     @security.protected(view_management_screens)
     def document_src(self, REQUEST=None, RESPONSE=None):
         """Return unprocessed document source."""
@@ -570,6 +876,55 @@ class PythonScript(Script, Historical, Cacheable):
 InitializeClass(PythonScript)
 
 
+def setProxyRoles(scripts, roles):
+    """Give all scripts the proxy roles roles.
+
+    Nothing is changed unless the user may change the proxy roles of
+    every script.  Only the scripts whose proxy roles differ are changed
+    and removed from their caches.  Return the number of changed scripts.
+    """
+    roles = tuple(roles)
+    security = getSecurityManager()
+    user = security.getUser()
+    changed = []
+    for script in scripts:
+        if not security.checkPermission(change_proxy_roles, script):
+            raise Unauthorized(
+                'You are not allowed to change the proxy roles of %s.'
+                % script.getId())
+        script._checkProxyChange(user, roles)
+        if script._proxy_roles != roles:
+            changed.append(script)
+    for script in changed:
+        script.ZCacheable_invalidate()
+        script._proxy_roles = roles
+    return len(changed)
+
+
+def _policy():
+    """Return the RestrictedPython policy used to compile Scripts."""
+    if getBoolSetting('optimize-guards'):
+        return OptimizingNodeTransformer
+    return RestrictingNodeTransformer
+
+
+def _signatureOf(function):
+    """Return the parameters of function as stored in _signature."""
+    return tuple(
+        (param.name, param.kind.name,
+         None if param.default is param.empty else repr(param.default))
+        for param in inspect.signature(function).parameters.values())
+
+
+def _referencedNames(code):
+    """Return all names referred to by code and its nested code objects."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.update(_referencedNames(const))
+    return frozenset(names)
+
+
 class PythonScriptTracebackSupplement:
     """Implementation of ITracebackSupplement"""
 
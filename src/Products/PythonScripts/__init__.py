@@ -11,12 +11,27 @@
 #
 ##############################################################################
 
+import json
+
+from AccessControl.requestmethod import requestmethod
 from Shared.DC import Scripts
+from zExceptions import BadRequest
 
 # To register helper functions at AccessControl and security declaration in the
 # module itself:
 from . import PythonScript
+from . import compilequeue
+from . import instrumentation
+from . import metrics
+from . import slowlog
 from . import standard  # noqa
+from . import tracing
+from .config import getBoolSetting
+from .indexing import iterDeactivating
+from .indexing import iterScripts
+from .indexing import reindexScripts
+from .inventory import iterJSONLines
+from .PythonScript import setProxyRoles
 
 
 __module_aliases__ = (
@@ -46,6 +61,34 @@ def initialize(context):
     global _m  # noqa: F824
     _m['recompile'] = recompile
     _m['recompile__roles__'] = ('Manager',)
+    _m['performance_report'] = performance_report
+    _m['performance_report__roles__'] = ('Manager',)
+    _m['guard_statistics'] = guard_statistics
+    _m['guard_statistics__roles__'] = ('Manager',)
+    _m['openmetrics'] = openmetrics
+    _m['openmetrics__roles__'] = ('Manager',)
+    _m['call_graph'] = call_graph
+    _m['call_graph__roles__'] = ('Manager',)
+    _m['compile_queue_status'] = compile_queue_status
+    _m['compile_queue_status__roles__'] = ('Manager',)
+    _m['reindex'] = reindex
+    _m['reindex__roles__'] = ('Manager',)
+    _m['set_proxy_roles'] = set_proxy_roles
+    _m['set_proxy_roles__roles__'] = ('Manager',)
+    _m['signatures'] = signatures
+    _m['signatures__roles__'] = ('Manager',)
+    _m['inventory'] = inventory
+    _m['inventory__roles__'] = ('Manager',)
+
+    slowlog.configure()
+    if getBoolSetting('guard-statistics'):
+        instrumentation.enable()
+    if getBoolSetting('metrics'):
+        metrics.enable()
+    if getBoolSetting('call-tracing'):
+        tracing.enable()
+    if getBoolSetting('background-compile'):
+        compilequeue.start()
 
 
 def recompile(self):
@@ -55,7 +98,7 @@ def recompile(self):
                             search_sub=1)
     names = []
     for name, ob in scripts:
-        if ob._v_change:
+        if ob._v_change or ob.compile_pending:
             names.append(name)
             ob._compile()
             ob._p_changed = 1
@@ -63,3 +106,110 @@ def recompile(self):
     if names:
         return 'The following Scripts were recompiled:\n' + '\n'.join(names)
     return 'No Scripts were found that required recompilation.'
+
+
+def performance_report(self):
+    """List the performance warnings of all Python Scripts"""
+    base = self.this()
+    scripts = base.ZopeFind(base, obj_metatypes=('Script (Python)',),
+                            search_sub=1)
+    lines = []
+    for name, ob in scripts:
+        if ob.performance_warnings:
+            lines.append(name)
+            lines.extend('  ' + line for line in ob.performance_warnings)
+
+    if lines:
+        return 'The following Scripts have performance warnings:\n' + \
+            '\n'.join(lines)
+    return 'No Scripts with performance warnings were found.'
+
+
+def guard_statistics(self, reset=0):
+    """Show the time spent in the security guards of Python Scripts"""
+    report = instrumentation.formatStatistics()
+    if not instrumentation.enabled:
+        report = 'Guard statistics are not enabled.\n' + report
+    if reset:
+        instrumentation.reset()
+    return report
+
+
+def openmetrics(self, REQUEST=None):
+    """Export the execution statistics of Python Scripts"""
+    if REQUEST is not None:
+        REQUEST.RESPONSE.setHeader('Content-Type', metrics.CONTENT_TYPE)
+    return metrics.formatMetrics()
+
+
+def call_graph(self, reset=0):
+    """Export the traced Script calls in the collapsed stack format"""
+    report = tracing.formatCollapsed()
+    if reset:
+        tracing.reset()
+    return report
+
+
+def compile_queue_status(self):
+    """Report the Python Scripts waiting to be compiled"""
+    base = self.this()
+    scripts = base.ZopeFind(base, obj_metatypes=('Script (Python)',),
+                            search_sub=1)
+    names = [name for name, ob in scripts if ob.compile_pending]
+    report = f'{compilequeue.depth()} Scripts are queued for compilation.'
+    if names:
+        report += '\nThe following Scripts are not compiled yet:\n' + \
+            '\n'.join(names)
+    return report
+
+
+def reindex(self, catalog_id, batch_size=100):
+    """Catalog the Python Scripts whose title or source changed"""
+    base = self.this()
+    catalog = getattr(base, catalog_id)
+    indexed, skipped = reindexScripts(catalog, iterScripts(base),
+                                      int(batch_size))
+    return f'{indexed} Scripts were cataloged, {skipped} were unchanged.'
+
+
+@requestmethod('POST')
+def set_proxy_roles(self, roles=(), paths=(), all=0, REQUEST=None):
+    """Give the Python Scripts at paths, or all of them, proxy roles"""
+    base = self.this()
+    if isinstance(paths, str):
+        paths = [paths]
+    if isinstance(roles, str):
+        roles = [roles]
+    if all:
+        if paths:
+            raise BadRequest('Give either paths or all, not both.')
+        scripts = iterScripts(base)
+    elif paths:
+        scripts = [base.restrictedTraverse(path) for path in paths]
+        for path, ob in zip(paths, scripts):
+            if getattr(ob, 'meta_type', None) != 'Script (Python)':
+                raise BadRequest(f'{path} is not a Python Script.')
+    else:
+        raise BadRequest('No Scripts given, use paths or all.')
+    changed = setProxyRoles(scripts, roles)
+    return f'The proxy roles of {changed} Scripts were changed.'
+
+
+def signatures(self, batch_size=100, REQUEST=None):
+    """Export the parameters of all Python Scripts as JSON"""
+    base = self.this()
+    scripts = iterDeactivating(iterScripts(base), int(batch_size))
+    result = {'/'.join(ob.getPhysicalPath()): ob.signature()
+              for ob in scripts}
+    if REQUEST is not None:
+        REQUEST.RESPONSE.setHeader('Content-Type', 'application/json')
+    return json.dumps(result)
+
+
+def inventory(self, batch_size=100, REQUEST=None):
+    """Export the metadata of all Python Scripts as JSON lines"""
+    base = self.this()
+    return standard.stream(
+        REQUEST is not None and REQUEST.RESPONSE or None,
+        iterJSONLines(iterScripts(base), int(batch_size)),
+        'application/x-ndjson')
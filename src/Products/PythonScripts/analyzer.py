@@ -0,0 +1,191 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Static analysis of Script bodies
+
+Looks for code patterns which are known to be slow in Python Scripts.
+The analysis works on the syntax tree only, it is done when a Script is
+compiled and never when it is called.
+"""
+
+import ast
+
+
+_catalog_methods = frozenset((
+    'searchResults',
+    'unrestrictedSearchResults',
+    'evalAdvancedQuery',
+))
+_traverse_methods = frozenset((
+    'restrictedTraverse',
+    'unrestrictedTraverse',
+))
+# Methods of the context and container which are not other scripts.
+_ordinary_methods = frozenset((
+    'Description',
+    'Title',
+    'absolute_url',
+    'absolute_url_path',
+    'get',
+    'getId',
+    'getPhysicalPath',
+    'getProperty',
+    'hasObject',
+    'hasProperty',
+    'items',
+    'keys',
+    'objectIds',
+    'objectItems',
+    'objectValues',
+    'propertyIds',
+    'propertyItems',
+    'propertyValues',
+    'title_or_id',
+    'values',
+    'virtual_url_path',
+))
+
+
+class PerformanceAnalyzer(ast.NodeVisitor):
+    """Collect performance warnings for a Script body.
+
+    ``script_names`` are the names under which other scripts are usually
+    reached, i.e. the names bound to the context and the container.
+    Which of their methods are scripts is not known when compiling, so
+    calls of them inside loops are reported unless they are well known
+    ordinary methods.
+    """
+
+    def __init__(self, script_names=()):
+        self.script_names = frozenset(script_names)
+        self.warnings = []
+        self._loop_depth = 0
+        self._traversed = set()
+        self._print_seen = False
+
+    def warn(self, node, info):
+        self.warnings.append(f'Line {node.lineno}: {info}')
+
+    def _visit_in_loop(self, nodes):
+        self._loop_depth += 1
+        try:
+            for node in nodes:
+                self.visit(node)
+        finally:
+            self._loop_depth -= 1
+
+    def visit_For(self, node):
+        # The iterable is evaluated once before the loop, and the else
+        # block once after it.
+        self.visit(node.iter)
+        self._visit_in_loop([node.target, *node.body])
+        for child in node.orelse:
+            self.visit(child)
+
+    def visit_While(self, node):
+        self._visit_in_loop([node.test, *node.body])
+        for child in node.orelse:
+            self.visit(child)
+
+    def _visit_comprehension(self, node):
+        # Only the iterable of the first generator is evaluated once.
+        first, *rest = node.generators
+        self.visit(first.iter)
+        nodes = [first.target, *first.ifs]
+        for generator in rest:
+            nodes.extend((generator.target, generator.iter, *generator.ifs))
+        if isinstance(node, ast.DictComp):
+            nodes.extend((node.key, node.value))
+        else:
+            nodes.append(node.elt)
+        self._visit_in_loop(nodes)
+
+    visit_ListComp = visit_SetComp = visit_DictComp = _visit_comprehension
+    visit_GeneratorExp = _visit_comprehension
+
+    def _visit_scope(self, node):
+        # The body of a function is not run once per loop iteration just
+        # because the function is defined inside a loop.
+        depth, self._loop_depth = self._loop_depth, 0
+        try:
+            self.generic_visit(node)
+        finally:
+            self._loop_depth = depth
+
+    visit_FunctionDef = visit_Lambda = visit_ClassDef = _visit_scope
+
+    def visit_AugAssign(self, node):
+        if (self._loop_depth and isinstance(node.op, ast.Add)
+                and _is_string(node.value)):
+            self.warn(node, 'String concatenation inside a loop, collect '
+                            'the parts in a list and use join() instead.')
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Name):
+            if func.id == 'print' and not self._print_seen:
+                self._print_seen = True
+                self.warn(node, 'print() fills the print collector, '
+                                'return or join strings instead.')
+            elif self._loop_depth and func.id.endswith('catalog'):
+                self.warn(node, 'Catalog query inside a loop.')
+        elif isinstance(func, ast.Attribute):
+            self._check_method_call(node, func)
+        self.generic_visit(node)
+
+    def _check_method_call(self, node, func):
+        name = func.attr
+        if self._loop_depth and (name in _catalog_methods
+                                 or name.endswith('catalog')):
+            self.warn(node, 'Catalog query inside a loop.')
+        elif name in _traverse_methods:
+            path = _constant_path(node)
+            if path is None:
+                return
+            if self._loop_depth:
+                self.warn(node, f'Traversal of the constant path "{path}" '
+                                'inside a loop.')
+            elif path in self._traversed:
+                self.warn(node, f'Repeated traversal of the constant path '
+                                f'"{path}".')
+            self._traversed.add(path)
+        elif (self._loop_depth and isinstance(func.value, ast.Name)
+                and func.value.id in self.script_names
+                and name not in _ordinary_methods
+                and not name.startswith('manage_')):
+            self.warn(node, f'Call of "{func.value.id}.{name}" inside a '
+                            'loop, which is expensive if it is a script.')
+
+
+def _is_string(node):
+    if isinstance(node, ast.Constant):
+        return isinstance(node.value, str)
+    if isinstance(node, ast.JoinedStr):
+        return True
+    if isinstance(node, ast.BinOp):
+        return _is_string(node.left) or _is_string(node.right)
+    return False
+
+
+def _constant_path(node):
+    if node.args and isinstance(node.args[0], ast.Constant) \
+       and isinstance(node.args[0].value, str):
+        return node.args[0].value
+    return None
+
+
+def analyze(tree, script_names=()):
+    """Return a tuple of performance warnings for a parsed Script body."""
+    analyzer = PerformanceAnalyzer(script_names)
+    analyzer.visit(tree)
+    return tuple(analyzer.warnings)
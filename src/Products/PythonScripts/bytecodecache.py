@@ -0,0 +1,177 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Compiled Scripts cache on the local disk
+
+Processes on the same host compile the same Scripts, e.g. when the
+Python version changed and every process finds the stored code stale.
+With ``bytecode-cache-dir`` in the ``pythonscripts`` product
+configuration the results of compiling are stored in that directory,
+one file per Script source, and shared by all processes using it.
+
+The files are named after a digest of everything the compiled code
+depends on, so they never need to be invalidated.  They are written
+atomically and read through a memory map.  Each process adds the size
+of the files it writes to the size of the directory it found when it
+last looked.  When that takes more than ``bytecode-cache-size`` bytes,
+the directory is scanned and, if it is indeed too large, the least
+recently used files are removed until it takes three quarters of the
+limit, so that it is not scanned again on every write.
+
+The directory is created accessible to its owner only.  Since the code
+in it is executed, it is not used when it is writable by others or owned
+by a different user.
+"""
+
+import hashlib
+import importlib.metadata
+import marshal
+import mmap
+import os
+import tempfile
+import threading
+from logging import getLogger
+
+from .config import getIntSetting
+from .config import getSetting
+
+
+LOG = getLogger('PythonScripts')
+
+DEFAULT_SIZE = 64 * 1024 * 1024
+
+_caches = {}  # {(directory, max_size): cache or None}
+_lock = threading.Lock()
+
+
+def _version(distribution):
+    try:
+        return importlib.metadata.version(distribution)
+    except importlib.metadata.PackageNotFoundError:
+        return ''
+
+
+_versions = (_version('RestrictedPython'), _version('Products.PythonScripts'))
+
+
+class BytecodeCache:
+
+    def __init__(self, directory, max_size=DEFAULT_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        # Estimated size of the files, None until the directory is scanned.
+        self._size = None
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def key(self, *parts):
+        """Return the key for the compilation of parts."""
+        digest = hashlib.sha256()
+        for part in _versions + parts:
+            digest.update(repr(part).encode('utf-8', 'backslashreplace'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the entry stored for key, or None."""
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    entry = marshal.loads(m)
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+        try:
+            # Mark the file as recently used.
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key, entry):
+        """Store entry, which must be marshallable, for key."""
+        data = marshal.dumps(entry)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, os.path.join(self.directory, key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            LOG.warning('Cannot write to the bytecode cache %s',
+                        self.directory, exc_info=True)
+            return
+        if self._size is None:
+            self.evict()
+        else:
+            self._size += len(data)
+            if self._size > self.max_size:
+                self.evict()
+
+    def evict(self):
+        """Remove the least recently used files above the size limit."""
+        files = []
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total > self.max_size:
+            files.sort()
+            for mtime, size, path in files:
+                if total <= self.max_size * 3 // 4:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    # Removed by another process.
+                    pass
+                total -= size
+        self._size = total
+
+
+def _isPrivate(directory):
+    try:
+        stat = os.stat(directory)
+    except OSError:
+        return False
+    if stat.st_mode & 0o022:
+        return False
+    return not hasattr(os, 'getuid') or stat.st_uid == os.getuid()
+
+
+def getCache():
+    """Return the configured cache, or None if there is none."""
+    directory = getSetting('bytecode-cache-dir')
+    if not directory:
+        return None
+    max_size = getIntSetting('bytecode-cache-size', DEFAULT_SIZE)
+    key = (directory, max_size)
+    with _lock:
+        if key not in _caches:
+            cache = BytecodeCache(directory, max_size)
+            if not _isPrivate(directory):
+                # Remember the rejection, to warn only once.
+                LOG.warning(
+                    'Not using the bytecode cache %s, it is writable by '
+                    'others or owned by a different user', directory)
+                cache = None
+            _caches[key] = cache
+        return _caches[key]
@@ -0,0 +1,108 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Background compilation of Scripts
+
+Scripts uploaded with PUT when ``background-compile`` is on are stored
+without being compiled.  After the transaction is committed they are put
+in a queue, and a worker thread compiles them and commits the result in
+a transaction of its own.  Until then the Scripts refuse to run.
+"""
+
+import queue
+import threading
+from logging import getLogger
+
+import transaction
+from ZODB.POSException import ConflictError
+
+
+LOG = getLogger('PythonScripts')
+
+# How often a compilation is tried again after a conflict.
+RETRIES = 3
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def schedule(script):
+    """Compile script after the current transaction was committed."""
+    transaction.get().addAfterCommitHook(_enqueue, (script,))
+
+
+def _enqueue(status, script):
+    if not status or script._p_jar is None:
+        # Aborted, or a Script which is not stored anywhere.
+        return
+    _queue.put((script._p_jar.db(), script._p_oid))
+
+
+def start():
+    """Start the worker thread, unless it is already running."""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, daemon=True,
+                                       name='PythonScripts compile queue')
+            _worker.start()
+
+
+def _work():
+    while True:
+        db, oid = _queue.get()
+        try:
+            compileScript(db, oid)
+        except Exception:
+            LOG.error('Compilation in the background failed', exc_info=True)
+        finally:
+            _queue.task_done()
+
+
+def process():
+    """Compile all queued Scripts in the current thread."""
+    while True:
+        try:
+            db, oid = _queue.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            compileScript(db, oid)
+        finally:
+            _queue.task_done()
+
+
+def depth():
+    """Return the number of Scripts waiting to be compiled."""
+    return _queue.qsize()
+
+
+def compileScript(db, oid):
+    """Compile the Script with oid, if it is still pending."""
+    tm = transaction.TransactionManager()
+    connection = db.open(transaction_manager=tm)
+    try:
+        for attempt in range(RETRIES):
+            try:
+                script = connection.get(oid)
+                if script.compile_pending:
+                    script._compile()
+                    tm.get().note('Compile %s' % script._getFilepath())
+                tm.commit()
+                return
+            except ConflictError:
+                tm.abort()
+        LOG.error('Giving up compiling %r after %s conflicts', oid, RETRIES)
+    finally:
+        tm.abort()
+        connection.close()
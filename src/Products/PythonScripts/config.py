@@ -0,0 +1,48 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Product configuration
+
+Settings are read from the ``pythonscripts`` product configuration
+section in zope.conf, e.g.::
+
+  <product-config pythonscripts>
+    performance-warnings off
+  </product-config>
+"""
+
+from App.config import getConfiguration
+
+
+_true_values = ('1', 'on', 'true', 'yes')
+
+
+def getSetting(name, default=None):
+    """Return the raw value of a setting, or default if it is not set."""
+    product_config = getattr(getConfiguration(), 'product_config', None)
+    if not product_config:
+        return default
+    return product_config.get('pythonscripts', {}).get(name, default)
+
+
+def getBoolSetting(name, default=False):
+    value = getSetting(name)
+    if value is None:
+        return default
+    return str(value).strip().lower() in _true_values
+
+
+def getIntSetting(name, default=0):
+    try:
+        return int(getSetting(name, default))
+    except (TypeError, ValueError):
+        return default
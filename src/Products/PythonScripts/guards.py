@@ -0,0 +1,76 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Attribute guard used by Python Scripts
+
+``guarded_getattr`` does a complete security check for every attribute
+access, even for the methods of strings, dicts, lists and DateTime
+objects which are always allowed.  For these types the names which
+``guarded_getattr`` would return unchanged are computed once, so the
+check becomes a dictionary and a set lookup.
+"""
+
+from AccessControl.SimpleObjectPolicies import ContainerAssertions
+from AccessControl.ZopeGuards import guarded_getattr
+from DateTime import DateTime
+
+
+_marker = []  # Create a new marker object.
+
+
+def _publicNames(type_):
+    return [name for name in dir(type_) if not name.startswith('_')]
+
+
+def _allowedNames(type_):
+    """Return the names guarded_getattr returns unchanged for type_."""
+    assertion = ContainerAssertions.get(type_)
+    if assertion is None:
+        # A public class, like DateTime.
+        if getattr(type_, '__roles__', _marker) is not None or \
+           getattr(type_, '__allow_access_to_unprotected_subobjects__',
+                   0) != 1:
+            return frozenset()
+        return frozenset(name for name in _publicNames(type_)
+                         if not hasattr(type_, name + '__roles__'))
+    if isinstance(assertion, dict):
+        return frozenset(name for name in _publicNames(type_)
+                         if assertion.get(name)
+                         and not callable(assertion[name]))
+    if callable(assertion):
+        # The assertion checks the value, so we need an instance.
+        sample = type_()
+        names = []
+        for name in _publicNames(type_):
+            factory = assertion(name, getattr(sample, name))
+            if factory == 1 and not callable(factory):
+                names.append(name)
+        return frozenset(names)
+    if assertion:
+        return frozenset(_publicNames(type_))
+    return frozenset()
+
+
+_allowed = {type_: _allowedNames(type_)
+            for type_ in (str, bytes, tuple, range, dict, list, DateTime)}
+
+
+def fast_guarded_getattr(inst, name, default=_marker):
+    """guarded_getattr with a shortcut for known safe types."""
+    names = _allowed.get(type(inst))
+    if names is not None and name in names:
+        if default is _marker:
+            return getattr(inst, name)
+        return getattr(inst, name, default)
+    if default is _marker:
+        return guarded_getattr(inst, name)
+    return guarded_getattr(inst, name, default)
@@ -0,0 +1,126 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Comparison of Script revisions for the History tab
+
+The metadata and the body of two revisions are compared separately,
+line by line, and only the changes with a few lines of context are
+rendered.  Revisions with more than ``history-diff-max-lines`` lines
+together (5000) are only summarized.  Rendered comparisons of stored
+revisions are cached by their database, oid and serials.
+"""
+
+import difflib
+from collections import Counter
+from html import escape
+
+from .config import getIntSetting
+from .lrucache import LRUCache
+
+
+CONTEXT = 3
+CACHE_SIZE = 100
+
+# {(database_name, oid, serial1, serial2): html}
+_cache = LRUCache(CACHE_SIZE)
+_z64 = b'\0' * 8
+
+
+def _row(tags, lines):
+    return ('<tr>\n<td><pre>\n%s\n</pre></td>\n<td><pre>\n%s\n</pre></td>\n'
+            '</tr>\n' % ('\n'.join(tags), escape('\n'.join(lines))))
+
+
+def _metadataRows(m1, m2):
+    tags = []
+    lines = []
+    for key in sorted(set(m1) | set(m2)):
+        old, new = m1.get(key, ''), m2.get(key, '')
+        if old != new:
+            tags.extend(('-', '+'))
+            lines.extend((f'{key}={old}', f'{key}={new}'))
+    if not tags:
+        return []
+    return [_row(tags, lines)]
+
+
+def _bodyRows(a, b):
+    rows = []
+    matcher = difflib.SequenceMatcher(None, a, b)
+    for group in matcher.get_grouped_opcodes(CONTEXT):
+        first, last = group[0], group[-1]
+        rows.append(_row(['@@'], [f'lines {first[1] + 1}-{last[2]} / '
+                                  f'{first[3] + 1}-{last[4]}']))
+        for tag, alo, ahi, blo, bhi in group:
+            if tag == 'equal':
+                rows.append(_row([' '] * (ahi - alo), a[alo:ahi]))
+                continue
+            tags = ['-'] * (ahi - alo) + ['+'] * (bhi - blo)
+            rows.append(_row(tags, a[alo:ahi] + b[blo:bhi]))
+    return rows
+
+
+def _summaryRows(a, b):
+    old, new = Counter(a), Counter(b)
+    removed = sum((old - new).values())
+    added = sum((new - old).values())
+    return [_row(['@@'], [
+        f'The revisions have {len(a)} and {len(b)} lines, too many to '
+        f'compare them line by line: {removed} lines were removed and '
+        f'{added} lines were added.'])]
+
+
+def render(rev1, rev2):
+    """Return an HTML table with the changes from rev1 to rev2."""
+    rows = _metadataRows(rev1._metadata_map(), rev2._metadata_map())
+    a = rev1._body.splitlines()
+    b = rev2._body.splitlines()
+    if len(a) + len(b) > getIntSetting('history-diff-max-lines', 5000):
+        rows.extend(_summaryRows(a, b))
+    else:
+        rows.extend(_bodyRows(a, b))
+    if not rows:
+        rows.append(_row([' '], ['The revisions are equal.']))
+    return '<table border=1>\n%s</table>' % ''.join(rows)
+
+
+def _cacheKey(rev1, rev2):
+    oid = getattr(rev2, '_p_oid', None)
+    if oid != getattr(rev1, '_p_oid', None):
+        return None
+    serial1 = getattr(rev1, '_p_serial', _z64)
+    serial2 = getattr(rev2, '_p_serial', _z64)
+    if oid is None or _z64 in (serial1, serial2) or \
+       rev2._p_changed or rev1._p_changed:
+        # Not stored, or changed after it was stored.
+        return None
+    jar = rev2._p_jar
+    if jar is None:
+        return None
+    # The oids of different databases, e.g. mounted ones, overlap.
+    return (jar.db().database_name, oid, serial1, serial2)
+
+
+def html_diff(rev1, rev2):
+    """Like render, but cached for stored revisions."""
+    key = _cacheKey(rev1, rev2)
+    if key is None:
+        return render(rev1, rev2)
+    result = _cache.get(key)
+    if result is None:
+        result = render(rev1, rev2)
+        _cache.set(key, result)
+    return result
+
+
+def clearCache():
+    _cache.clear()
@@ -0,0 +1,117 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Incremental cataloging of Python Scripts
+
+Every Script carries a digest of its title and of its searchable
+source, returned by ``content_hash``.  When a catalog has a
+``content_hash`` metadata column, ``reindexScripts`` skips the Scripts
+whose digest did not change since they were cataloged.  Changes of other
+attributes, like the bindings or the proxy roles, are not detected.
+"""
+
+import hashlib
+
+import transaction
+from Acquisition import aq_base
+
+
+CHUNK_SIZE = 65536
+
+
+def contentHash(params, body):
+    """Return the digest of the source returned by PrincipiaSearchSource.
+    """
+    digest = hashlib.sha256()
+    for text in (params, '\n', body):
+        # Encode long bodies piecewise instead of copying them at once.
+        for i in range(0, len(text), CHUNK_SIZE):
+            digest.update(
+                text[i:i + CHUNK_SIZE].encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+def titledHash(title, source_hash):
+    """Return the digest of title and of the digest of the source."""
+    text = f'{title}\n{source_hash}'
+    return hashlib.sha256(
+        text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+def iterScripts(folder):
+    """Yield the Python Scripts in folder and its subfolders."""
+    for ob in folder.objectValues():
+        # Look at the classes, which does not load the other objects.
+        klass = type(aq_base(ob))
+        if getattr(klass, 'meta_type', None) == 'Script (Python)':
+            yield ob
+        elif getattr(klass, 'isPrincipiaFolderish', 0):
+            yield from iterScripts(ob)
+
+
+def iterDeactivating(scripts, batch_size=100, savepoint=False):
+    """Yield scripts, removing them from memory again in batches.
+
+    After each batch_size scripts, the scripts which were not in the
+    ZODB cache before and were not changed are deactivated, so that
+    going through a large site does not push the objects in use out of
+    the cache.  With savepoint, a savepoint is made first.
+    """
+    batch = []
+    count = 0
+    for script in scripts:
+        base = aq_base(script)
+        was_ghost = getattr(base, '_p_changed', 0) is None
+        yield script
+        if was_ghost:
+            batch.append(base)
+        count += 1
+        if count % batch_size == 0:
+            _endBatch(batch, savepoint)
+    _endBatch(batch, savepoint)
+
+
+def _indexedHash(catalog, uid):
+    try:
+        return catalog.getMetadataForUID(uid).get('content_hash')
+    except (KeyError, AttributeError):
+        return None
+
+
+def reindexScripts(catalog, scripts, batch_size=100):
+    """Catalog the scripts whose title or source changed.
+
+    After each batch of scripts a savepoint is made and the scripts
+    which were loaded for it are removed from memory again, as with
+    iterDeactivating.  Return the number of cataloged and of skipped
+    scripts.
+    """
+    incremental = 'content_hash' in catalog.schema()
+    indexed = skipped = 0
+    for script in iterDeactivating(scripts, batch_size, savepoint=True):
+        uid = '/'.join(script.getPhysicalPath())
+        if incremental and \
+           _indexedHash(catalog, uid) == script.content_hash():
+            skipped += 1
+        else:
+            catalog.catalog_object(script, uid)
+            indexed += 1
+    return indexed, skipped
+
+
+def _endBatch(batch, savepoint):
+    if savepoint:
+        transaction.savepoint(optimistic=True)
+    for script in batch:
+        if not script._p_changed:
+            script._p_deactivate()
+    del batch[:]
@@ -0,0 +1,130 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Cost accounting for the security guards of Python Scripts
+
+When enabled, the guard functions in the globals of every Script call are
+replaced by wrappers which count the calls and measure the time spent in
+them, per script and per line.  The time spent in security validation is
+included in the time of the guard which triggered it.
+"""
+
+import sys
+import threading
+from time import perf_counter
+
+
+GUARDS = (
+    '_apply_',
+    '_getattr_',
+    '_getitem_',
+    '_getiter_',
+    '_inplacevar_',
+    '_iter_unpack_sequence_',
+    '_unpack_sequence_',
+    '_write_',
+)
+
+enabled = False
+_lock = threading.Lock()
+_guard_stats = {}  # {script path: {guard name: [calls, seconds]}}
+_line_stats = {}  # {script path: {line: [calls, seconds]}}
+_wrappers = {}  # {(guard name, guard): wrapper}
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    with _lock:
+        _guard_stats.clear()
+        _line_stats.clear()
+
+
+def _record(path, line, name, elapsed):
+    with _lock:
+        stats = _guard_stats.setdefault(path, {}).setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+        stats = _line_stats.setdefault(path, {}).setdefault(line, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _wrap(name, guard):
+    def instrumented_guard(*args, **kw):
+        start = perf_counter()
+        try:
+            return guard(*args, **kw)
+        finally:
+            elapsed = perf_counter() - start
+            frame = sys._getframe(1)
+            _record(frame.f_globals.get('__file__'), frame.f_lineno,
+                    name, elapsed)
+    return instrumented_guard
+
+
+def instrument(safe_globals):
+    """Replace the guards in safe_globals by counting wrappers."""
+    for name in GUARDS:
+        guard = safe_globals.get(name)
+        if guard is None:
+            continue
+        key = (name, guard)
+        wrapper = _wrappers.get(key)
+        if wrapper is None:
+            wrapper = _wrappers[key] = _wrap(name, guard)
+        safe_globals[name] = wrapper
+
+
+def getStatistics():
+    """Return a copy of the statistics as ``{path: (guards, lines)}``.
+
+    ``guards`` maps guard names and ``lines`` line numbers to
+    ``(calls, seconds)`` tuples.
+    """
+    with _lock:
+        return {
+            path: ({name: tuple(v) for name, v in guards.items()},
+                   {line: tuple(v)
+                    for line, v in _line_stats.get(path, {}).items()})
+            for path, guards in _guard_stats.items()}
+
+
+def formatStatistics(max_lines=10):
+    """Return a text report, the most expensive scripts first."""
+    stats = getStatistics()
+    if not stats:
+        return 'No guard calls were recorded.'
+
+    def total(item):
+        return sum(seconds for calls, seconds in item[1][0].values())
+
+    out = []
+    for path, (guards, lines) in sorted(stats.items(), key=total,
+                                        reverse=True):
+        out.append(path)
+        for name, (calls, seconds) in sorted(guards.items()):
+            out.append(f'  {name:<24}{calls:>10} calls {seconds * 1e3:>10.3f} '
+                       f'ms')
+        by_cost = sorted(lines.items(), key=lambda i: i[1][1], reverse=True)
+        for line, (calls, seconds) in by_cost[:max_lines]:
+            out.append(f'  {"line %s" % line:<24}{calls:>10} calls '
+                       f'{seconds * 1e3:>10.3f} ms')
+    return '\n'.join(out)
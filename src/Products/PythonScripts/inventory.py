@@ -0,0 +1,58 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Inventory of the Python Scripts of a site
+
+The metadata of every Script is read from its stored attributes, without
+rebuilding its source.  Scripts which were not in the ZODB cache before
+are removed from it again after each batch, as with
+``indexing.iterDeactivating``.
+"""
+
+import json
+
+from Acquisition import aq_base
+
+from .indexing import iterDeactivating
+
+
+def scriptInfo(script):
+    """Return a mapping with the metadata of script."""
+    base = aq_base(script)
+    python_magic = getattr(base, 'Python_magic', None)
+    return {
+        'path': '/'.join(script.getPhysicalPath()),
+        'size': len(base._body),
+        'content_hash': script.content_hash(),
+        'python_magic': python_magic and python_magic.hex(),
+        'script_magic': getattr(base, 'Script_magic', None),
+        'compiled': getattr(base, '_code', None) is not None,
+        'compile_pending': base.compile_pending,
+        'errors': len(base.errors),
+        'warnings': len(base.warnings),
+        'performance_warnings': len(base.performance_warnings),
+        'proxy_roles': list(base._proxy_roles),
+        'bindings': script.getBindingAssignments().getAssignedNames(),
+        'cache_manager': script.ZCacheable_getManagerId(),
+    }
+
+
+def iterInventory(scripts, batch_size=100):
+    """Yield the metadata of scripts as with scriptInfo."""
+    for script in iterDeactivating(scripts, batch_size):
+        yield scriptInfo(script)
+
+
+def iterJSONLines(scripts, batch_size=100):
+    """Yield the metadata of scripts as JSON, one line per script."""
+    for info in iterInventory(scripts, batch_size):
+        yield json.dumps(info) + '\n'
@@ -0,0 +1,135 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Execution statistics of Python Scripts in OpenMetrics format
+
+When enabled, calls, errors, call durations, cache hits and misses and
+compilations are counted per Script in memory.  ``formatMetrics``
+renders the counters in the OpenMetrics text format understood by
+Prometheus compatible collectors.
+"""
+
+import threading
+from bisect import bisect_left
+
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Upper bounds of the duration histogram buckets in seconds.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+           10.0)
+
+enabled = False
+_lock = threading.Lock()
+_scripts = {}  # {script path: _Stats}
+
+
+class _Stats:
+
+    __slots__ = ('calls', 'errors', 'seconds', 'buckets', 'cache_hits',
+                 'cache_misses', 'compiles')
+
+    def __init__(self):
+        self.calls = self.errors = self.seconds = 0
+        self.cache_hits = self.cache_misses = self.compiles = 0
+        # One more bucket for the durations above the last bound.
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    with _lock:
+        _scripts.clear()
+
+
+def _stats(path):
+    stats = _scripts.get(path)
+    if stats is None:
+        stats = _scripts[path] = _Stats()
+    return stats
+
+
+def recordCall(path, seconds, failed=False):
+    with _lock:
+        stats = _stats(path)
+        stats.calls += 1
+        if failed:
+            stats.errors += 1
+        stats.seconds += seconds
+        stats.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+
+def recordCacheLookup(path, hit):
+    with _lock:
+        stats = _stats(path)
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+def recordCompile(path):
+    with _lock:
+        _stats(path).compiles += 1
+
+
+def _label(path):
+    path = path.replace('\\', '\\\\').replace('"', '\\"')
+    return 'script="%s"' % path.replace('\n', '\\n')
+
+
+def _counter(out, name, text, values):
+    out.append(f'# TYPE pythonscripts_{name} counter')
+    out.append(f'# HELP pythonscripts_{name} {text}')
+    for label, value in values:
+        out.append(f'pythonscripts_{name}_total{{{label}}} {value}')
+
+
+def formatMetrics():
+    """Return the statistics in the OpenMetrics text format."""
+    with _lock:
+        scripts = sorted(((_label(path), stats)
+                          for path, stats in _scripts.items()),
+                         key=lambda item: item[0])
+        out = []
+        _counter(out, 'calls', 'Calls of the Script.',
+                 [(label, s.calls) for label, s in scripts])
+        _counter(out, 'errors', 'Calls of the Script which raised.',
+                 [(label, s.errors) for label, s in scripts])
+        name = 'pythonscripts_call_duration_seconds'
+        out.append(f'# TYPE {name} histogram')
+        out.append(f'# UNIT {name} seconds')
+        out.append(f'# HELP {name} Duration of the calls of the Script.')
+        for label, s in scripts:
+            count = 0
+            for bound, calls in zip(BUCKETS + ('+Inf',), s.buckets):
+                count += calls
+                out.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+            out.append(f'{name}_count{{{label}}} {s.calls}')
+            out.append(f'{name}_sum{{{label}}} {s.seconds}')
+        _counter(out, 'cache_hits', 'Results taken from the cache.',
+                 [(label, s.cache_hits) for label, s in scripts])
+        _counter(out, 'cache_misses', 'Results not found in the cache.',
+                 [(label, s.cache_misses) for label, s in scripts])
+        _counter(out, 'compiles', 'Compilations of the Script.',
+                 [(label, s.compiles) for label, s in scripts])
+    out.append('# EOF')
+    return '\n'.join(out) + '\n'
@@ -0,0 +1,175 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Guard elision for restricted code
+
+``OptimizingNodeTransformer`` is a RestrictedPython policy which leaves
+out the guard calls that cannot deny access to anything:
+
+- ``_getiter_`` when iterating over a list or tuple display or over the
+  ``range`` builtin,
+
+- ``_getitem_`` when reading from a dict, list or tuple which the script
+  created itself and which can only be filled by the script itself,
+
+- ``_getattr_`` when calling a method of a string literal.
+
+Everything else is transformed exactly like RestrictedPython does it.
+Constant expressions are folded by the Python compiler itself.
+"""
+
+import ast
+from collections import Counter
+
+from RestrictedPython import RestrictingNodeTransformer
+
+
+# Methods of str which guarded_getattr returns unchanged; format and
+# format_map are replaced by safe versions and must stay guarded.
+_safe_str_methods = frozenset((
+    'capitalize', 'casefold', 'center', 'count', 'encode', 'endswith',
+    'expandtabs', 'find', 'index', 'isalnum', 'isalpha', 'isascii',
+    'isdecimal', 'isdigit', 'isidentifier', 'islower', 'isnumeric',
+    'isprintable', 'isspace', 'istitle', 'isupper', 'join', 'ljust',
+    'lower', 'lstrip', 'partition', 'removeprefix', 'removesuffix',
+    'replace', 'rfind', 'rindex', 'rjust', 'rpartition', 'rsplit',
+    'rstrip', 'split', 'splitlines', 'startswith', 'strip', 'swapcase',
+    'title', 'translate', 'upper', 'zfill',
+))
+_scope_nodes = (
+    ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef,
+    ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp,
+)
+
+
+def _is_display(node):
+    """Is node a container display without unpacking?"""
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return not any(isinstance(elt, ast.Starred) for elt in node.elts)
+    if isinstance(node, ast.Dict):
+        # ``{**mapping}`` copies items without any guard.
+        return None not in node.keys
+    return isinstance(node, (ast.ListComp, ast.DictComp))
+
+
+def _bound_names(node):
+    """Return the names bound by node itself."""
+    if isinstance(node, ast.Name):
+        if not isinstance(node.ctx, ast.Load):
+            return (node.id,)
+    elif isinstance(node, ast.arg):
+        return (node.arg,)
+    elif isinstance(node, ast.alias):
+        return ((node.asname or node.name).split('.')[0],)
+    elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef,
+                           ast.ClassDef)):
+        return (node.name,)
+    elif isinstance(node, (ast.Global, ast.Nonlocal)):
+        return tuple(node.names)
+    elif isinstance(node, ast.ExceptHandler):
+        if node.name:
+            return (node.name,)
+    elif isinstance(node, (ast.MatchAs, ast.MatchStar)):
+        if node.name:
+            return (node.name,)
+    elif isinstance(node, ast.MatchMapping):
+        if node.rest:
+            return (node.rest,)
+    return ()
+
+
+class _Analysis:
+    """Find the names which can be proven to need no guards."""
+
+    def __init__(self, tree):
+        self.bindings = Counter()
+        self.displays = set()
+        self.parents = {}
+        self._walk(tree, 0)
+        self.local_displays = frozenset(
+            name for name in self.displays
+            if self.bindings[name] == 1 and self._only_subscripted(tree, name))
+
+    def _walk(self, node, depth):
+        for name in _bound_names(node):
+            self.bindings[name] += 1
+        if (depth == 1 and isinstance(node, ast.Assign)
+                and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name)
+                and _is_display(node.value)):
+            self.displays.add(node.targets[0].id)
+        if isinstance(node, _scope_nodes):
+            depth += 1
+        for child in ast.iter_child_nodes(node):
+            self.parents[child] = node
+            self._walk(child, depth)
+
+    def _only_subscripted(self, tree, name):
+        # The object may only be read or filled by subscripts.  Anything
+        # else (methods like update or extend, passing it to a function,
+        # slice assignment) could fill it with unguarded values.
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Name) and node.id == name
+                    and isinstance(node.ctx, ast.Load)):
+                continue
+            parent = self.parents.get(node)
+            if not (isinstance(parent, ast.Subscript)
+                    and parent.value is node):
+                return False
+            if not isinstance(parent.ctx, ast.Load) \
+               and isinstance(parent.slice, ast.Slice):
+                return False
+            if isinstance(self.parents.get(parent), ast.AugAssign):
+                return False
+        return True
+
+
+class OptimizingNodeTransformer(RestrictingNodeTransformer):
+    """RestrictedPython policy which elides guards proven unnecessary."""
+
+    range_is_builtin = True
+    local_displays = frozenset()
+
+    def visit_Module(self, node):
+        analysis = _Analysis(node)
+        self.range_is_builtin = analysis.bindings['range'] == 0
+        self.local_displays = analysis.local_displays
+        return super().visit_Module(node)
+
+    def _is_safe_iter(self, node):
+        if isinstance(node, (ast.List, ast.Tuple)):
+            return _is_display(node)
+        return (self.range_is_builtin
+                and isinstance(node, ast.Call)
+                and isinstance(node.func, ast.Name)
+                and node.func.id == 'range')
+
+    def guard_iter(self, node):
+        if isinstance(node.target, ast.Tuple) \
+           or not self._is_safe_iter(node.iter):
+            return super().guard_iter(node)
+        return self.node_contents_visit(node)
+
+    def visit_Subscript(self, node):
+        if (isinstance(node.ctx, ast.Load)
+                and isinstance(node.value, ast.Name)
+                and node.value.id in self.local_displays):
+            return self.node_contents_visit(node)
+        return super().visit_Subscript(node)
+
+    def visit_Attribute(self, node):
+        if (isinstance(node.ctx, ast.Load)
+                and isinstance(node.value, ast.Constant)
+                and isinstance(node.value.value, str)
+                and node.attr in _safe_str_methods):
+            return self.node_contents_visit(node)
+        return super().visit_Attribute(node)
@@ -0,0 +1,154 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Logging of slow Script calls
+
+A call is slow when it takes longer than the threshold of the Script
+or, if the Script has none, the ``slow-call-threshold`` of the product
+configuration, both in milliseconds.  The product configuration is read
+by ``configure`` when the product is initialized.  Messages for the same
+Script are logged at most once per ``slow-call-log-interval`` seconds,
+the number of calls which were not logged is reported with the next
+message.
+"""
+
+import re
+import reprlib
+import threading
+from time import monotonic
+
+from Acquisition import aq_parent
+
+from .config import getSetting
+
+
+_redacted = re.compile(r'passw|secret|token|key|auth|credential|session',
+                       re.IGNORECASE)
+_max_value_length = 80
+_max_summary_length = 500
+
+# The slow-call-threshold of the product configuration.
+threshold = 0
+_lock = threading.Lock()
+_last_logged = {}  # {script path: (time, suppressed calls)}
+
+
+def _floatSetting(name, default):
+    try:
+        return float(getSetting(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def configure():
+    """Read the threshold from the product configuration."""
+    global threshold
+    threshold = _floatSetting('slow-call-threshold', 0)
+
+
+def getThreshold(script):
+    """Return the threshold in seconds for script, or None."""
+    value = getattr(script, 'slow_call_threshold', None) or threshold
+    if value > 0:
+        return value / 1000.0
+    return None
+
+
+class _ArgumentRepr(reprlib.Repr):
+    """Repr which only looks at the beginning of large values."""
+
+    def repr_instance(self, x, level):
+        # The repr of other objects is made in full before it is cut,
+        # which is too expensive for e.g. large catalog results.
+        try:
+            length = len(x)
+        except Exception:
+            length = 0
+        if length > self.maxlist:
+            return f'<{type(x).__name__} of {length} items>'
+        return super().repr_instance(x, level)
+
+
+_repr = _ArgumentRepr()
+_repr.maxstring = _repr.maxother = _max_value_length
+_repr.maxlevel = 3
+
+
+def _shorten(text, length):
+    if len(text) > length:
+        return text[:length - 3] + '...'
+    return text
+
+
+def summarizeArguments(names, args, kw):
+    """Return a size-bounded summary of the arguments of a call.
+
+    The values of arguments whose names look like credentials are
+    replaced by ``***``.
+    """
+    items = []
+    for i, value in enumerate(args):
+        name = names[i] if i < len(names) else None
+        items.append((name, value))
+    items.extend(kw.items())
+    parts = []
+    for name, value in items:
+        if name is not None and _redacted.search(name):
+            value = '***'
+        else:
+            try:
+                value = _repr.repr(value)
+            except Exception:
+                value = '<unrepresentable>'
+        parts.append(value if name is None else f'{name}={value}')
+    return _shorten(', '.join(parts), _max_summary_length)
+
+
+def _shouldLog(path):
+    """Apply the rate limit, return the number of suppressed calls or None.
+    """
+    interval = _floatSetting('slow-call-log-interval', 60)
+    now = monotonic()
+    with _lock:
+        last, suppressed = _last_logged.get(path, (None, 0))
+        if last is not None and now - last < interval:
+            _last_logged[path] = (last, suppressed + 1)
+            return None
+        _last_logged[path] = (now, 0)
+        return suppressed
+
+
+def reset():
+    with _lock:
+        _last_logged.clear()
+
+
+def logSlowCall(log, script, elapsed, args, kw):
+    path = script._getFilepath()
+    suppressed = _shouldLog(path)
+    if suppressed is None:
+        return
+    code = script._v_ft[0]
+    names = code.co_varnames[:code.co_argcount]
+    parent = aq_parent(script)
+    try:
+        context = '/'.join(parent.getPhysicalPath())
+    except AttributeError:
+        context = None
+    request = getattr(script, 'REQUEST', None)
+    url = request.get('URL', None) if hasattr(request, 'get') else None
+    message = (f'Slow call of {path} took {elapsed * 1000:.1f} ms '
+               f'({summarizeArguments(names, args, kw)}), '
+               f'context {context}, URL {url}')
+    if suppressed:
+        message += f', {suppressed} slow calls were not logged'
+    log.warning(message)
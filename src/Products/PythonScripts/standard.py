@@ -18,11 +18,26 @@ Scripts.  It can be accessed from Python with the statement
 "import Products.PythonScripts.standard"
 """
 
+import datetime
+import hashlib
+import json
+import keyword
+import tempfile
+import types
+from html import escape
+from urllib.parse import quote
+from urllib.parse import quote_plus
 from urllib.parse import urlencode  # NOQA
 
 from AccessControl.SecurityInfo import ModuleSecurityInfo
 from AccessControl.SecurityManagement import getSecurityManager
+from AccessControl.ZopeGuards import guard
+from AccessControl.ZopeGuards import guarded_getattr
+from AccessControl.ZopeGuards import guarded_getitem
+from AccessControl.ZopeGuards import guarded_hasattr
+from AccessControl.ZopeGuards import guarded_iter
 from App.special_dtml import HTML
+from DateTime.DateTime import DateTime
 from DocumentTemplate.DT_Var import dollars_and_cents  # NOQA
 from DocumentTemplate.DT_Var import html_quote  # NOQA
 from DocumentTemplate.DT_Var import newline_to_br  # NOQA
@@ -37,7 +52,12 @@ from DocumentTemplate.DT_Var import url_unquote  # NOQA
 from DocumentTemplate.DT_Var import url_unquote_plus  # NOQA
 from DocumentTemplate.DT_Var import whole_dollars  # NOQA
 from DocumentTemplate.security import RestrictedDTML
+from zope.interface import implementer
 from ZPublisher.HTTPRequest import record
+from ZPublisher.Iterators import IStreamIterator
+
+from .config import getIntSetting
+from .lrucache import LRUCache
 
 
 security = ModuleSecurityInfo('Products.PythonScripts.standard')
@@ -59,13 +79,44 @@ security.declarePublic(  # noqa: D001
     'urlencode',
     'DTML',
     'Object',
+    'RecordType',
+    'Records',
+    'whole_dollars_each',
+    'dollars_and_cents_each',
+    'thousands_commas_each',
+    'html_quote_each',
+    'url_quote_each',
+    'url_quote_plus_each',
+    'sql_quote_each',
+    'iter_formatted',
+    'stream',
+    'json_dumps',
+    'json_loads',
+    'json_iterencode',
 )
 
 
+# Parsed DTML sources by their digest, shared by all DTML objects.
+_dtml_cache = LRUCache(getIntSetting('dtml-cache-size', 256))
+
+
 class DTML(RestrictedDTML, HTML):
     """DTML objects are DocumentTemplate.HTML objects that allow
        dynamic, temporary creation of restricted DTML."""
 
+    def cook(self):
+        source = self.read()
+        if isinstance(source, str):
+            source = source.encode('utf-8', 'surrogatepass')
+        key = hashlib.sha256(source).digest()
+        blocks = _dtml_cache.get(key)
+        if blocks is None:
+            HTML.cook(self)
+            _dtml_cache.set(key, self._v_blocks)
+        else:
+            self._v_blocks = blocks
+            self._v_cooked = None
+
     def __call__(self, client=None, REQUEST={}, RESPONSE=None, **kw):
         """Render the DTML given a client object, REQUEST mapping,
         Response, and key word arguments."""
@@ -110,4 +161,391 @@ def Object(**kw):
     return _Object(**kw)
 
 
+# Types of the items which restricted code may always get out of lists,
+# tuples and dicts.
+_public_types = frozenset(
+    (str, bytes, int, float, bool, type(None), dict, list, tuple))
+
+
+def _guarded_iter(values):
+    # Values come from restricted code, which may only iterate over them
+    # as far as their security declarations allow.
+    if isinstance(values, types.GeneratorType):
+        # guarded_iter refuses the items of generators, which have no
+        # security declarations, so they are checked like list items.
+        return _guarded_items(values)
+    if type(values) in (list, tuple) and \
+       _public_types.issuperset(map(type, values)):
+        # What guarded_iter would allow, without checking each item.
+        return values
+    return guarded_iter(values)
+
+
+def _guarded_items(values):
+    for value in values:
+        guard((), value)
+        yield value
+
+
+def _guarded_get(row, key):
+    try:
+        return guarded_getitem(row, key)
+    except KeyError:
+        return None
+
+
+class _Record:
+    """Base class of the record types made by RecordType."""
+
+    __slots__ = ()
+    __roles__ = None
+    __allow_access_to_unprotected_subobjects__ = 1
+    _guarded_writes = 1
+    _fields = ()
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self._fields:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return list(self._fields)
+
+    def values(self):
+        return [getattr(self, name) for name in self._fields]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self._fields]
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % item for item in self.items()))
+
+
+_record_types = LRUCache(256)
+
+
+def RecordType(*fields):
+    """Return a record type with the given fields.
+
+    Records take less memory and are faster to create than Objects, as
+    they have a fixed set of fields.  Fields can be read as attributes
+    or items and may be given positionally or as keyword arguments when
+    a record is created; missing fields are None.
+    """
+    fields = tuple(str(name) for name in fields)
+    record_type = _record_types.get(fields)
+    if record_type is not None:
+        return record_type
+    for name in fields:
+        if not name.isidentifier() or keyword.iskeyword(name) or \
+           name.startswith('_') or hasattr(_Record, name):
+            raise ValueError('Record field name %r is invalid.' % name)
+    if len(set(fields)) != len(fields):
+        raise ValueError('Record field names must be unique.')
+    # Generate __init__ like collections.namedtuple does, it is much
+    # faster than setting the fields in a loop.
+    args = ''.join(', %s=None' % name for name in fields)
+    body = ''.join('\n    self.%s = %s' % (name, name) for name in fields)
+    namespace = {}
+    exec(f'def __init__(self{args}):{body or " pass"}', namespace)
+    record_type = type('Record', (_Record,), {
+        '__slots__': fields,
+        '_fields': fields,
+        '__init__': namespace['__init__'],
+    })
+    _record_types.set(fields, record_type)
+    return record_type
+
+
+def Records(fields, rows):
+    """Return a list of records with fields made from rows.
+
+    Rows are either mappings, whose other keys are ignored, or
+    sequences of the values of the fields in order.
+    """
+    record_type = RecordType(*fields)
+    fields = record_type._fields
+    result = []
+    for row in _guarded_iter(rows):
+        if type(row) is dict:
+            values = list(map(row.get, fields))
+            if _public_types.issuperset(map(type, values)):
+                result.append(record_type(*values))
+                continue
+        if guarded_hasattr(row, 'keys'):
+            result.append(record_type(
+                *[_guarded_get(row, name) for name in fields]))
+        else:
+            result.append(record_type(*_guarded_iter(row)))
+    return result
+
+
+# Formatting of single values for the batch variants.  They take the
+# shortest way for the common types and give the same results as the
+# functions they are named after.
+
+def _whole_dollars(v):
+    try:
+        return '$%d' % v
+    except Exception:
+        return ''
+
+
+def _dollars_and_cents(v):
+    try:
+        return '$%.2f' % v
+    except Exception:
+        return ''
+
+
+def _thousands_commas(v):
+    if type(v) is int:
+        return f'{v:,}'
+    return thousands_commas(v)
+
+
+def _html_quote(v):
+    if type(v) is str:
+        return escape(v, True)
+    return html_quote(v)
+
+
+def _url_quote(v):
+    if type(v) is str:
+        return quote(v)
+    return url_quote(v)
+
+
+def _url_quote_plus(v):
+    if type(v) is str:
+        return quote_plus(v)
+    return url_quote_plus(v)
+
+
+_formats = {
+    'whole_dollars': _whole_dollars,
+    'dollars_and_cents': _dollars_and_cents,
+    'thousands_commas': _thousands_commas,
+    'html_quote': _html_quote,
+    'url_quote': _url_quote,
+    'url_quote_plus': _url_quote_plus,
+    'sql_quote': sql_quote,
+}
+
+
+class _Iterator:
+    """Iterator which restricted code may use."""
+
+    __roles__ = None
+    __allow_access_to_unprotected_subobjects__ = 1
+
+    def __init__(self, iterator):
+        self._iterator = iterator
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+
+def iter_formatted(format, values):
+    """Return an iterator over the values formatted with format.
+
+    format is the name of one of the formatting functions of this module
+    which have a batch variant, e.g. 'html_quote'.
+    """
+    try:
+        function = _formats[format]
+    except KeyError:
+        raise ValueError('Unknown format %r.' % format)
+    return _Iterator(map(function, _guarded_iter(values)))
+
+
+def whole_dollars_each(values):
+    """Return the list of whole_dollars of each value."""
+    return list(map(_whole_dollars, _guarded_iter(values)))
+
+
+def dollars_and_cents_each(values):
+    """Return the list of dollars_and_cents of each value."""
+    return list(map(_dollars_and_cents, _guarded_iter(values)))
+
+
+def thousands_commas_each(values):
+    """Return the list of thousands_commas of each value."""
+    return list(map(_thousands_commas, _guarded_iter(values)))
+
+
+def html_quote_each(values):
+    """Return the list of html_quote of each value."""
+    return list(map(_html_quote, _guarded_iter(values)))
+
+
+def url_quote_each(values):
+    """Return the list of url_quote of each value."""
+    return list(map(_url_quote, _guarded_iter(values)))
+
+
+def url_quote_plus_each(values):
+    """Return the list of url_quote_plus of each value."""
+    return list(map(_url_quote_plus, _guarded_iter(values)))
+
+
+def sql_quote_each(values):
+    """Return the list of sql_quote of each value."""
+    return list(map(sql_quote, _guarded_iter(values)))
+
+
+STREAM_BLOCK_SIZE = 1 << 16
+
+
+@implementer(IStreamIterator)
+class _StreamIterator:
+    """Iterator over the blocks of a spooled response body."""
+
+    def __init__(self, file, size):
+        self._file = file
+        self._size = size
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        data = self._file.read(STREAM_BLOCK_SIZE)
+        if not data:
+            self.close()
+            raise StopIteration
+        return data
+
+    def __len__(self):
+        return self._size
+
+    def close(self):
+        self._file.close()
+
+
+def stream(RESPONSE, chunks, content_type=None, filename=None):
+    """Return the chunks as a response body which the publisher streams.
+
+    chunks is an iterable of strings or bytes, e.g. a generator yielding
+    the lines of a CSV export.  The chunks are written to a temporary
+    file as they are made, which is kept in memory only while it is
+    smaller than ``stream-spool-size`` bytes (1 MB), so the whole result
+    is never held in memory.  The file is read by the publisher after
+    the transaction ended, while the chunks are made with the database
+    and the permissions of the script.
+
+    Strings are encoded with the charset of RESPONSE.  The content type
+    and, for a download, the file name are set on RESPONSE, which may be
+    None when the result is not published.
+    """
+    encoding = 'utf-8'
+    if RESPONSE is not None:
+        encoding = getattr(RESPONSE, 'charset', None) or encoding
+    file = tempfile.SpooledTemporaryFile(
+        max_size=getIntSetting('stream-spool-size', 1 << 20))
+    try:
+        size = 0
+        for chunk in _guarded_iter(chunks):
+            if isinstance(chunk, str):
+                chunk = chunk.encode(encoding)
+            elif not isinstance(chunk, (bytes, bytearray)):
+                raise TypeError('Stream chunks must be strings or bytes, '
+                                'not %s.' % type(chunk).__name__)
+            file.write(chunk)
+            size += len(chunk)
+        file.seek(0)
+    except BaseException:
+        file.close()
+        raise
+    if RESPONSE is not None:
+        setHeader = guarded_getattr(RESPONSE, 'setHeader')
+        if content_type is not None:
+            if content_type.startswith('text/') and \
+               'charset=' not in content_type:
+                content_type = f'{content_type}; charset={encoding}'
+            setHeader('Content-Type', content_type)
+        if filename is not None:
+            setHeader('Content-Disposition',
+                      "attachment; filename*=UTF-8''%s" % quote(filename))
+        setHeader('Content-Length', str(size))
+    return _StreamIterator(file, size)
+
+
+class _JSONEncoder(json.JSONEncoder):
+    """Encoder which also accepts dates, Objects and records.
+
+    Other objects are refused, so that only data which the script could
+    read anyway ends up in the result.
+    """
+
+    def default(self, o):
+        if isinstance(o, DateTime):
+            return o.ISO8601()
+        if isinstance(o, (datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, _Object):
+            return {key: value for key, value in o.__dict__.items()
+                    if not key.startswith('_')}
+        if isinstance(o, _Record):
+            return dict(o.items())
+        if isinstance(o, (tuple, set, frozenset)):
+            return list(o)
+        raise TypeError('Object of type %s is not JSON serializable.'
+                        % type(o).__name__)
+
+
+def json_dumps(value, indent=None, sort_keys=False):
+    """Return value encoded as JSON.
+
+    Besides the types of the json module, DateTime and datetime values
+    are encoded as ISO 8601 strings, and Objects and records as JSON
+    objects.
+    """
+    return _JSONEncoder(indent=indent, sort_keys=sort_keys).encode(value)
+
+
+def _joined(chunks, size):
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def json_iterencode(value, indent=None, sort_keys=False):
+    """Return an iterator over the JSON encoding of value in chunks.
+
+    Use it with ``stream`` to publish large values without encoding them
+    at once, e.g. ``return stream(RESPONSE, json_iterencode(rows),
+    'application/json')``.
+    """
+    encoder = _JSONEncoder(indent=indent, sort_keys=sort_keys)
+    return _Iterator(_joined(encoder.iterencode(value), STREAM_BLOCK_SIZE))
+
+
+def json_loads(text):
+    """Return the value encoded as JSON in text."""
+    return json.loads(text)
+
+
 security.apply(globals())
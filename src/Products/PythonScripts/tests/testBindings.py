@@ -273,3 +273,50 @@ class TestBindings(unittest.TestCase):
         self.assertRaises(Unauthorized, ps)
         ps = guarded._getOb('bound_used_context_methodWithRoles_ps')
         self.assertEqual(ps(), 'method called')
+
+    # These test that bindings which are not referenced by the code of
+    # the script are not computed at all.
+
+    def _bindAll(self, ps):
+        ps.ZBindings_edit({'name_context': 'context',
+                           'name_container': 'container',
+                           'name_m_self': 'script',
+                           'name_ns': 'namespace',
+                           'name_subpath': 'traverse_subpath'})
+
+    def test_bound_unused_not_computed(self):
+        from AccessControl.SecurityManagement import newSecurityManager
+        newSecurityManager(None, UnderprivilegedUser())
+        root = self._makeTree()
+        guarded = root._getOb('guarded')
+        ps = guarded._getOb('bound_unused_context_ps')
+        self._bindAll(ps)
+
+        def fail(*args):
+            self.fail('Unused binding computed.')
+
+        ps._getContext = ps._getContainer = fail
+        ps._getNamespace = ps._getTraverseSubpath = fail
+        self.assertEqual(ps(), 1)
+        # Assigned names are still removed from the keyword arguments.
+        self.assertEqual(ps(context=2, namespace=3), 1)
+
+    def test_bound_used_namespace_computed(self):
+        root = self._makeTree()
+        guarded = root._getOb('guarded')
+        ps = self._newPS('return namespace, traverse_subpath')
+        guarded._setOb('namespace_ps', ps)
+        ps = guarded._getOb('namespace_ps')
+        self._bindAll(ps)
+        ps._getContext = ps._getContainer = None
+        namespace, subpath = ps()
+        self.assertIsNotNone(namespace)
+        self.assertEqual(subpath, [])
+
+    def test_bound_names_follow_edits(self):
+        root = self._makeTree()
+        guarded = root._getOb('guarded')
+        ps = guarded._getOb('bound_unused_container_ps')
+        self.assertEqual(ps(), 1)
+        ps.write('return container.getId()')
+        self.assertEqual(ps(), 'guarded')
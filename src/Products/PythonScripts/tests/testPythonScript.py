@@ -16,15 +16,18 @@ import io
 import os
 import sys
 import traceback
+import types
 import unittest
 import warnings
 from urllib.error import HTTPError
 
+import transaction
 import zExceptions
 import Zope2
 from AccessControl.Permissions import change_proxy_roles
 from AccessControl.SecurityManagement import newSecurityManager
 from AccessControl.SecurityManagement import noSecurityManager
+from Acquisition import aq_base
 from OFS.Folder import Folder
 from Testing.makerequest import makerequest
 from Testing.testbrowser import Browser
@@ -46,6 +49,18 @@ def warning_interceptor():
         sys.stderr = old_stderr
 
 
+@contextlib.contextmanager
+def product_config(**settings):
+    from App.config import getConfiguration
+    config = getConfiguration()
+    old = getattr(config, 'product_config', None)
+    config.product_config = {'pythonscripts': settings}
+    try:
+        yield
+    finally:
+        config.product_config = old
+
+
 # Test Classes
 
 
@@ -367,6 +382,25 @@ return \xc3\xa4\xc3\xa9\xc3\xae\xc3\xb6\xc3\xbc
         self.assertEqual(container.testing.body(), 'return 1\n')
         self.assertEqual(container.testing.params(), '')
 
+    def testBatch(self):
+        ps = self._newPS('##parameters=x, y=1\nreturn x * y')
+        results = ps.batch([((2,), {}), ((2,), {'y': 3}), ((), {'x': 4})])
+        self.assertIsInstance(results, types.GeneratorType)
+        self.assertEqual(list(results), [2, 6, 4])
+
+    def testBatchBindings(self):
+        ps = self._newPS('##parameters=x\nreturn script, x',
+                         bind={'name_m_self': 'script'})
+        results = list(ps.batch([((1,), {}), ((), {'x': 2, 'script': 3})]))
+        self.assertEqual(results, [(ps, 1), (ps, 2)])
+
+    def testBatchWithErrors(self):
+        ps = PythonScript('ps')
+        ps.ZBindings_edit({})
+        ps.write('1 +')
+        self.assertTrue(ps.errors)
+        self.assertRaises(RuntimeError, ps.batch, [((), {})])
+
     def testCodeIntrospection(self):
         script = self._newPS('##parameters=a="b"')
 
@@ -430,6 +464,1304 @@ class TestPythonScriptErrors(PythonScriptTestBase):
                 PythonScript(identifier)
 
 
+class TestPythonScriptPerformanceWarnings(PythonScriptTestBase):
+
+    def _warnings(self, body):
+        ps = self._newPS(body, bind={'name_context': 'context',
+                                     'name_container': 'container'})
+        return ps.performance_warnings
+
+    def testNoWarnings(self):
+        self.assertEqual(self._warnings('return [x for x in range(3)]'), ())
+
+    def testCatalogQueryInLoop(self):
+        warnings = self._warnings(
+            'for t in ("a", "b"):\n'
+            '    context.portal_catalog(portal_type=t)\n'
+            '    context.portal_catalog.searchResults(portal_type=t)\n')
+        self.assertEqual(warnings, ('Line 2: Catalog query inside a loop.',
+                                    'Line 3: Catalog query inside a loop.'))
+
+    def testLoopIterableEvaluatedOnce(self):
+        warnings = self._warnings(
+            'for b in context.portal_catalog(portal_type="Page"):\n'
+            '    pass\n'
+            'ids = [b.id for b in context.catalog.searchResults()]\n'
+            'for o in context.restrictedTraverse("a/b").objectValues():\n'
+            '    pass\n'
+            'd = {k: v for k, v in context.portal_catalog().items()}\n')
+        self.assertEqual(warnings, ())
+
+    def testLoopElseRunOnce(self):
+        warnings = self._warnings(
+            'for t in ("a", "b"):\n'
+            '    pass\n'
+            'else:\n'
+            '    context.portal_catalog()\n'
+            'while 0:\n'
+            '    pass\n'
+            'else:\n'
+            '    context.portal_catalog()\n')
+        self.assertEqual(warnings, ())
+
+    def testNestedLoopIterable(self):
+        warnings = self._warnings(
+            'for t in ("a", "b"):\n'
+            '    for b in context.portal_catalog(portal_type=t):\n'
+            '        pass\n'
+            'ids = [b for t in ("a", "b") for b in context.searchResults()]\n'
+            'while context.portal_catalog():\n'
+            '    pass\n')
+        self.assertEqual(warnings, ('Line 2: Catalog query inside a loop.',
+                                    'Line 4: Catalog query inside a loop.',
+                                    'Line 5: Catalog query inside a loop.'))
+
+    def testConstantTraversal(self):
+        warnings = self._warnings(
+            'a = context.restrictedTraverse("a/b")\n'
+            'b = context.restrictedTraverse("a/b")\n'
+            'while a:\n'
+            '    a = context.restrictedTraverse("c")\n')
+        self.assertEqual(len(warnings), 2)
+        self.assertIn('Line 2: Repeated traversal', warnings[0])
+        self.assertIn('Line 4: Traversal of the constant path "c"',
+                      warnings[1])
+
+    def testStringConcatenationInLoop(self):
+        warnings = self._warnings(
+            's = ""\n'
+            'for i in range(3):\n'
+            '    s += "%s," % i\n'
+            'n = 0\n'
+            'for i in range(3):\n'
+            '    n += i\n'
+            'return s, n\n')
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('Line 3: String concatenation', warnings[0])
+
+    def testPrint(self):
+        warnings = self._warnings('print(1)\nprint(2)\nreturn printed')
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('Line 1: print()', warnings[0])
+
+    def testScriptCallInLoop(self):
+        warnings = self._warnings(
+            'def f(x):\n'
+            '    return container.format_item(x)\n'
+            'return [container.format_item(x) for x in range(3)]\n')
+        self.assertEqual(warnings, (
+            'Line 3: Call of "container.format_item" inside a loop, which '
+            'is expensive if it is a script.',))
+
+    def testOrdinaryMethodCallInLoop(self):
+        warnings = self._warnings(
+            'for i in range(3):\n'
+            '    context.getId()\n'
+            '    container.objectValues()\n'
+            '    context.manage_changeProperties(title=i)\n')
+        self.assertEqual(warnings, ())
+
+    def testSyntaxError(self):
+        ps = PythonScript('ps')
+        ps.ZBindings_edit({})
+        ps.write('1 +')
+        self.assertTrue(ps.errors)
+        self.assertEqual(ps.performance_warnings, ())
+
+    def testDisabled(self):
+        with product_config(**{'performance-warnings': 'off'}):
+            self.assertEqual(self._warnings('print(1)'), ())
+
+    def testPerformanceReport(self):
+        from Products.PythonScripts import performance_report
+        container = DummyFolder('container')
+        container._setObject('ok', self._newPS('return 1'))
+        container._setObject('slow', self._newPS('print(1)'))
+        report = performance_report(container)
+        self.assertIn('slow\n  Line 1: print()', report)
+        self.assertNotIn('ok', report)
+
+
+class TestGuardOptimizer(PythonScriptTestBase):
+
+    def _newPS(self, txt, bind=None):
+        with product_config(**{'optimize-guards': 'on'}):
+            return PythonScriptTestBase._newPS(self, txt, bind)
+
+    def _guardCalls(self, ps, args=(), bound_names=None):
+        # Call the script, returning the names of the guards called.
+        calls = []
+        safe_globals = ps._v_ft[1]
+        for name in ('_getiter_', '_getitem_', '_getattr_'):
+            def guard(*args, _name=name, _guard=safe_globals[name]):
+                calls.append(_name)
+                return _guard(*args)
+            safe_globals[name] = guard
+        try:
+            result = ps._exec(bound_names, args, {})
+        except Exception as e:
+            result = e
+        return result, calls
+
+    def assertElided(self, guard, body, expected):
+        result, calls = self._guardCalls(self._newPS(body))
+        self.assertEqual(result, expected)
+        self.assertNotIn(guard, calls)
+
+    def assertGuarded(self, guard, body, args=(), bound_names=None):
+        result, calls = self._guardCalls(self._newPS(body), args, bound_names)
+        self.assertIn(guard, calls)
+
+    def testSameResults(self):
+        for name in ('big_boolean', 'boolean_map', 'complex_print',
+                     'fibonacci', 'for_loop', 'mutate_literals',
+                     'try_except', 'tuple_unpack_assignment', 'while_loop'):
+            expected = self._filePS(name)()
+            with product_config(**{'optimize-guards': 'on'}):
+                self.assertEqual(self._filePS(name)(), expected)
+
+    def testIterDisplaysAndRange(self):
+        self.assertElided(
+            '_getiter_',
+            'r = []\n'
+            'for x in [1, 2]:\n'
+            '    r.append(x)\n'
+            'for x in (3,):\n'
+            '    r.append(x)\n'
+            'return r + [x for x in range(2)]\n',
+            [1, 2, 3, 0, 1])
+
+    def testLocalDisplaySubscripts(self):
+        self.assertElided(
+            '_getitem_',
+            'd = {"a": 1}\n'
+            'l = [x for x in range(3)]\n'
+            'd["b"] = 2\n'
+            'return d["a"] + d["b"] + l[2] + len(l[1:])\n',
+            7)
+
+    def testStringLiteralMethods(self):
+        self.assertElided('_getattr_', 'return "-".join(["a", "b"])', 'a-b')
+
+    def testShadowedRange(self):
+        self.assertGuarded(
+            '_getiter_',
+            'range = lambda n: [n]\nfor x in range(1):\n    return x')
+
+    def testUnpackingIter(self):
+        self.assertGuarded('_getiter_', '##parameters=m\nfor x in [*m]: pass',
+                           args=([1],))
+        self.assertGuarded('_getiter_', 'for a, b in [(1, 2)]: pass')
+
+    def testDictUnpacking(self):
+        self.assertGuarded('_getitem_',
+                           '##parameters=m\nd = {**m}\nreturn d["a"]',
+                           args=({'a': 1},))
+
+    def testSliceAssignment(self):
+        self.assertGuarded('_getitem_',
+                           '##parameters=m\nl = []\nl[:] = m\nreturn l[0]',
+                           args=([1],))
+
+    def testMethodCallOnDisplay(self):
+        self.assertGuarded(
+            '_getitem_',
+            '##parameters=m\nd = {}\nd.update(m)\nreturn d["a"]',
+            args=({'a': 1},))
+
+    def testPassedToFunction(self):
+        self.assertGuarded(
+            '_getitem_',
+            '##parameters=f\nd = {}\nf(d)\nreturn d["a"]',
+            args=(lambda d: d.update(a=1),))
+
+    def testRebound(self):
+        self.assertGuarded(
+            '_getitem_',
+            '##parameters=m\nd = {}\nd = m\nreturn d["a"]',
+            args=({'a': 1},))
+        self.assertGuarded(
+            '_getitem_',
+            '##parameters=d\nd = {}\nreturn d["a"]',
+            args=({'a': 1},))
+
+    def testBoundInNestedScope(self):
+        self.assertGuarded(
+            '_getitem_',
+            'def f():\n'
+            '    container = {}\n'
+            '    return container\n'
+            'return container["a"]\n',
+            bound_names={'container': {'a': 1}})
+
+    def testStringFormat(self):
+        self.assertGuarded('_getattr_', 'return "a{}".format(1)')
+
+
+class TestFastGuardedGetattr(PythonScriptTestBase):
+
+    def testAllowedMethods(self):
+        res = self._newPS(
+            'd = {}\n'
+            'd.update({"a": " x "})\n'
+            'l = [d["a"].strip().upper()]\n'
+            'l.append(DateTime("2007/12/10").year())\n'
+            'return l\n')()
+        self.assertEqual(res, ['X', 2007])
+
+    def testWrappedMethods(self):
+        # Methods which guarded_getattr replaces are not taken as they are.
+        get, pop = self._newPS('return {}.get, [].pop')()
+        self.assertNotEqual(type(get), type({}.get))
+        self.assertNotEqual(type(pop), type([].pop))
+
+    def testStringFormat(self):
+        from zExceptions import Unauthorized
+        ps = self._newPS('return "{0.__class__}".format(1)')
+        self.assertRaises(Unauthorized, ps)
+
+    def testPrivateNames(self):
+        from DateTime import DateTime
+        from zExceptions import Unauthorized
+
+        from ..guards import fast_guarded_getattr
+        self.assertRaises(Unauthorized, fast_guarded_getattr,
+                          DateTime(), '_year')
+        self.assertRaises(Unauthorized, fast_guarded_getattr, 'a', '__class__')
+
+    def testDefault(self):
+        from ..guards import fast_guarded_getattr
+        self.assertEqual(fast_guarded_getattr('a', 'missing', 1), 1)
+        self.assertEqual(fast_guarded_getattr(object(), 'missing', 1), 1)
+        self.assertRaises(AttributeError, fast_guarded_getattr, 'a', 'missing')
+
+    def testSubclassNotShortcut(self):
+        from ..guards import _allowed
+
+        class MyStr(str):
+            pass
+
+        self.assertNotIn(MyStr, _allowed)
+
+
+class TestCompileCost(PythonScriptTestBase):
+
+    def testRecorded(self):
+        ps = self._newPS('x = 1\nreturn x')
+        self.assertGreater(ps.compile_time, 0)
+        self.assertEqual(ps.ast_size, 8)
+
+    def testSyntaxError(self):
+        ps = PythonScript('ps')
+        ps.write('return (')
+        self.assertEqual(ps.ast_size, 0)
+
+    def testShownInReadWhenSlow(self):
+        ps = self._newPS('return 1')
+        self.assertNotIn('Compiled in', ps.read())
+        with product_config(**{'slow-compile-threshold': '0'}):
+            text = ps.read()
+        self.assertIn('\n## Compiled in ', text)
+        self.assertIn(' ms, 3 syntax tree nodes.\n', text)
+        ps.write(text)
+        self.assertEqual(ps.body(), 'return 1\n')
+
+    def testMaxBodySize(self):
+        ps = self._newPS('return 1')
+        with product_config(**{'max-body-size': '20'}):
+            ps.write('return 2')
+            with self.assertRaises(zExceptions.BadRequest) as raised:
+                ps.write('return "%s"' % ('x' * 20))
+        self.assertEqual(str(raised.exception),
+                         'The body of ps has 30 characters, more than the 20 '
+                         'characters allowed.')
+        self.assertEqual(ps.body(), 'return 2\n')
+
+    def testMaxBodySizeKeepsHeaders(self):
+        ps = self._newPS('##title=Old\n##parameters=a\nreturn a')
+        with product_config(**{'max-body-size': '20'}):
+            with self.assertNoLogs('PythonScripts', 'ERROR'):
+                self.assertRaises(
+                    zExceptions.BadRequest, ps.write,
+                    '##title=New\n##parameters=b\nreturn "%s"' % ('x' * 20))
+        self.assertEqual(ps.title, 'Old')
+        self.assertEqual(ps.params(), 'a')
+        self.assertEqual(ps(1), 1)
+
+
+class TestBackgroundCompile(PythonScriptTestBase):
+
+    def setUp(self):
+        from ZODB import DB
+        from ZODB.MappingStorage import MappingStorage
+        PythonScriptTestBase.setUp(self)
+        self.db = DB(MappingStorage())
+        self.connection = self.db.open()
+        folder = DummyFolder('folder')
+        self.connection.root()['folder'] = folder
+        ps = self._newPS('return 1')
+        ps._filepath = 'Script (Python):/ps'
+        folder._setObject('ps', ps)
+        transaction.commit()
+        self.folder = folder
+
+    def tearDown(self):
+        transaction.abort()
+        self.connection.close()
+        self.db.close()
+        PythonScriptTestBase.tearDown(self)
+
+    def _put(self, body):
+        ps = makerequest(self.folder.ps)
+        ps.REQUEST['BODY'] = body
+        with product_config(**{'background-compile': 'on'}):
+            ps.PUT(ps.REQUEST, ps.REQUEST.RESPONSE)
+        self.assertEqual(ps.REQUEST.RESPONSE.getStatus(), 204)
+        return self.folder.ps
+
+    def testPUT(self):
+        from .. import compilequeue
+        ps = self._put('##parameters=a\nreturn a * 2')
+        self.assertTrue(ps.compile_pending)
+        self.assertEqual(ps.body(), 'return a * 2\n')
+        with self.assertRaises(RuntimeError) as raised:
+            ps(1)
+        self.assertEqual(str(raised.exception),
+                         'Script (Python) ps is not compiled yet.')
+        self.assertEqual(compilequeue.depth(), 0)
+        transaction.commit()
+        self.assertEqual(compilequeue.depth(), 1)
+        compilequeue.process()
+        self.assertEqual(compilequeue.depth(), 0)
+        # See the changes of the compile transaction.
+        transaction.begin()
+        self.assertFalse(ps.compile_pending)
+        self.assertEqual(ps(3), 6)
+
+    def testErrorsReported(self):
+        from .. import compilequeue
+        self._put('return (')
+        transaction.commit()
+        compilequeue.process()
+        transaction.begin()
+        ps = self.folder.ps
+        self.assertFalse(ps.compile_pending)
+        self.assertTrue(ps.errors)
+        with self.assertRaises(RuntimeError) as raised:
+            ps()
+        self.assertEqual(str(raised.exception),
+                         'Script (Python) ps has errors.')
+
+    def testAbort(self):
+        from .. import compilequeue
+        self._put('return 2')
+        transaction.abort()
+        self.assertEqual(compilequeue.depth(), 0)
+        self.assertEqual(self.folder.ps(), 1)
+
+    def testStatusAndRecompile(self):
+        from .. import compile_queue_status
+        from .. import compilequeue
+        from .. import recompile
+        self._put('return 2')
+        transaction.commit()
+        self.assertEqual(compile_queue_status(self.folder),
+                         '1 Scripts are queued for compilation.\n'
+                         'The following Scripts are not compiled yet:\nps')
+        self.assertIn('ps', recompile(self.folder))
+        self.assertEqual(self.folder.ps(), 2)
+        transaction.commit()
+        compilequeue.process()
+        self.assertEqual(compile_queue_status(self.folder),
+                         '0 Scripts are queued for compilation.')
+
+    def testCacheInvalidated(self):
+        ps = self._newPS('return 1')
+        cache = {}
+        ps.ZCacheable_isCachingEnabled = lambda: 1
+        ps.ZCacheable_get = lambda keywords, default: cache.get(
+            keywords['*'], default)
+        ps.ZCacheable_set = lambda data, keywords: cache.__setitem__(
+            keywords['*'], data)
+        ps.ZCacheable_invalidate = cache.clear
+        self.assertEqual(ps(), 1)
+        ps._write('return 2', defer=True)
+        with self.assertRaises(RuntimeError):
+            ps()
+        ps._compile()
+        self.assertEqual(ps(), 2)
+
+    def testWithoutSetting(self):
+        ps = makerequest(self.folder.ps)
+        ps.REQUEST['BODY'] = 'return 2'
+        ps.PUT(ps.REQUEST, ps.REQUEST.RESPONSE)
+        self.assertFalse(ps.compile_pending)
+        self.assertEqual(ps(), 2)
+
+
+class TestBytecodeCache(PythonScriptTestBase):
+
+    def setUp(self):
+        import tempfile
+        PythonScriptTestBase.setUp(self)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, 'cache')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        PythonScriptTestBase.tearDown(self)
+
+    @contextlib.contextmanager
+    def _noCompile(self):
+        from .. import PythonScript as module
+
+        def compile_restricted_function(*args, **kw):
+            raise AssertionError('compiled')
+
+        orig = module.compile_restricted_function
+        module.compile_restricted_function = compile_restricted_function
+        try:
+            yield
+        finally:
+            module.compile_restricted_function = orig
+
+    def _newPS(self, txt, bind=None):
+        with product_config(**{'bytecode-cache-dir': self.directory}):
+            return PythonScriptTestBase._newPS(self, txt, bind)
+
+    def testCompileUsesCache(self):
+        ps = self._newPS('##parameters=a\nreturn a + 1')
+        with self._noCompile():
+            ps2 = self._newPS('##parameters=a\nreturn a + 1')
+        self.assertEqual(ps2(1), 2)
+        self.assertEqual(ps2._code, ps._code)
+        self.assertEqual(ps2.ast_size, ps.ast_size)
+        self.assertEqual(ps2.ZScriptHTML_tryParams(), ['a'])
+
+    def testSourceChangesKey(self):
+        self._newPS('return 1')
+        files = len(os.listdir(self.directory))
+        self._newPS('return 2')
+        self.assertEqual(len(os.listdir(self.directory)), files + 1)
+
+    def testErrorsNotCached(self):
+        self._newPS('return 1')
+        files = os.listdir(self.directory)
+        self.assertRaises(SyntaxError, self._newPS, 'return (')
+        self.assertEqual(os.listdir(self.directory), files)
+
+    def testStaleSetstate(self):
+        ps = self._newPS('return 1')
+        state = ps.__getstate__()
+        state['Python_magic'] = b'old'
+        ps2 = PythonScript.__new__(PythonScript)
+        with self._noCompile():
+            with product_config(**{'bytecode-cache-dir': self.directory}):
+                ps2.__setstate__(state)
+        self.assertEqual(ps2(), 1)
+
+    def testCorruptFile(self):
+        from ..bytecodecache import BytecodeCache
+        cache = BytecodeCache(self.directory)
+        with open(os.path.join(self.directory, 'key'), 'wb') as f:
+            f.write(b'\xff')
+        self.assertIsNone(cache.get('key'))
+        self.assertIsNone(cache.get('missing'))
+
+    def testEviction(self):
+        from ..bytecodecache import BytecodeCache
+        cache = BytecodeCache(self.directory, max_size=3500)
+        for i, key in enumerate(('a', 'b', 'c', 'd')):
+            cache.set(key, b'x' * 1000)
+            os.utime(os.path.join(self.directory, key), (i, i))
+        # Files are removed down to three quarters of the limit.
+        self.assertEqual(sorted(os.listdir(self.directory)), ['c', 'd'])
+        self.assertEqual(cache.get('d'), b'x' * 1000)
+
+    def testEvictionScansOnlyAboveLimit(self):
+        from ..bytecodecache import BytecodeCache
+        cache = BytecodeCache(self.directory, max_size=3500)
+        scans = []
+        evict = cache.evict
+        cache.evict = lambda: scans.append(1) or evict()
+        for key in 'abcdefg':
+            cache.set(key, b'x' * 1000)
+        # The first write scans, then every write going over the limit.
+        self.assertEqual(len(scans), 3)
+        self.assertEqual(len(os.listdir(self.directory)), 3)
+
+    def _getCache(self):
+        from ..bytecodecache import getCache
+        with product_config(**{'bytecode-cache-dir': self.directory}):
+            return getCache()
+
+    def testDirectoryMode(self):
+        self.assertIsNotNone(self._getCache())
+        self.assertEqual(os.stat(self.directory).st_mode & 0o777, 0o700)
+
+    def testWritableDirectoryNotUsed(self):
+        os.mkdir(self.directory)
+        os.chmod(self.directory, 0o777)
+        with self.assertLogs('PythonScripts', 'WARNING') as logs:
+            self.assertIsNone(self._getCache())
+            self.assertIsNone(self._getCache())
+            ps = self._newPS('return 1')
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(ps(), 1)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def testOtherOwnerNotUsed(self):
+        uid = os.stat(self.tmp.name).st_uid
+        orig = os.getuid
+        os.getuid = lambda: uid + 1
+        try:
+            self.assertIsNone(self._getCache())
+        finally:
+            os.getuid = orig
+
+
+class DummyCatalog:
+
+    def __init__(self, columns=('content_hash',)):
+        self.columns = columns
+        self.metadata = {}
+        self.cataloged = []
+
+    def schema(self):
+        return self.columns
+
+    def catalog_object(self, obj, uid):
+        self.cataloged.append(uid)
+        self.metadata[uid] = {name: getattr(obj, name)()
+                              for name in self.columns}
+
+    def getMetadataForUID(self, uid):
+        return self.metadata[uid]
+
+
+class TestContentHash(PythonScriptTestBase):
+
+    def _folder(self):
+        folder = DummyFolder('folder')
+        folder._setObject('sub', DummyFolder('sub'))
+        for id, parent in (('a', folder), ('b', folder), ('c', folder.sub)):
+            ps = self._newPS('return 1')
+            ps.id = id
+            parent._setObject(id, ps)
+        return folder
+
+    def testContentHash(self):
+        ps = self._newPS('##parameters=a\nreturn a')
+        digest = ps.content_hash()
+        self.assertEqual(len(digest), 64)
+        ps.write('##parameters=a\nreturn a')
+        self.assertEqual(ps.content_hash(), digest)
+        ps.ZPythonScript_edit('a, b', 'return a')
+        self.assertNotEqual(ps.content_hash(), digest)
+
+    def testContentHashTitle(self):
+        ps = self._newPS('return 1')
+        digest = ps.content_hash()
+        ps.ZPythonScript_setTitle('Title')
+        self.assertNotEqual(ps.content_hash(), digest)
+
+    def testContentHashWithoutAttribute(self):
+        ps = self._newPS('return 1')
+        digest = ps.content_hash()
+        del ps._content_hash
+        self.assertEqual(ps.content_hash(), digest)
+
+    def testReindexSkipsUnchanged(self):
+        from .. import reindex
+        folder = self._folder()
+        folder.catalog = catalog = DummyCatalog()
+        self.assertEqual(reindex(folder, 'catalog', batch_size='2'),
+                         '3 Scripts were cataloged, 0 were unchanged.')
+        self.assertEqual(sorted(catalog.cataloged), ['a', 'b', 'c'])
+        folder.sub.c.write('return 2')
+        catalog.cataloged = []
+        self.assertEqual(reindex(folder, 'catalog'),
+                         '1 Scripts were cataloged, 2 were unchanged.')
+        self.assertEqual(catalog.cataloged, ['c'])
+        folder.a.ZPythonScript_setTitle('Title')
+        catalog.cataloged = []
+        self.assertEqual(reindex(folder, 'catalog'),
+                         '1 Scripts were cataloged, 2 were unchanged.')
+        self.assertEqual(catalog.cataloged, ['a'])
+
+    def testReindexWithoutHashColumn(self):
+        from .. import reindex
+        folder = self._folder()
+        folder.catalog = DummyCatalog(columns=())
+        reindex(folder, 'catalog')
+        self.assertEqual(reindex(folder, 'catalog'),
+                         '3 Scripts were cataloged, 0 were unchanged.')
+
+
+class DummyJar:
+
+    def __init__(self, database_name):
+        self.database_name = database_name
+
+    def db(self):
+        return self
+
+
+class TestHistoryDiff(PythonScriptTestBase):
+
+    def tearDown(self):
+        from .. import historydiff
+        historydiff.clearCache()
+        PythonScriptTestBase.tearDown(self)
+
+    def _revisions(self):
+        lines = ['x%s = %s' % (i, i) for i in range(20)]
+        rev1 = self._newPS('\n'.join(lines))
+        lines[9] = 'x9 = "<changed>"'
+        rev2 = self._newPS('##parameters=a\n' + '\n'.join(lines))
+        return rev1, rev2
+
+    def testRender(self):
+        from ..historydiff import render
+        html = render(*self._revisions())
+        self.assertIn('-\n+\n</pre></td>\n<td><pre>\nparameters=\n'
+                      'parameters=a\n', html)
+        self.assertIn('lines 7-13 / 7-13', html)
+        self.assertIn('-\n+\n</pre></td>\n<td><pre>\nx9 = 9\n'
+                      'x9 = &quot;&lt;changed&gt;&quot;\n', html)
+        self.assertIn('x6 = 6', html)
+        self.assertNotIn('x5 = 5', html)
+        self.assertNotIn('x13 = 13', html)
+
+    def testEqual(self):
+        from ..historydiff import render
+        rev1, rev2 = self._revisions()
+        self.assertIn('The revisions are equal.', render(rev1, rev1))
+
+    def testSummary(self):
+        from ..historydiff import render
+        with product_config(**{'history-diff-max-lines': '30'}):
+            html = render(*self._revisions())
+        self.assertIn('The revisions have 20 and 20 lines, too many to '
+                      'compare them line by line: 1 lines were removed and '
+                      '1 lines were added.', html)
+        self.assertNotIn('x6 = 6', html)
+
+    def testCache(self):
+        from ..historydiff import html_diff
+        rev1, rev2 = self._revisions()
+        self.assertIsNot(html_diff(rev1, rev2), html_diff(rev1, rev2))
+        for rev, serial in ((rev1, b'\0' * 7 + b'\1'),
+                            (rev2, b'\0' * 7 + b'\2')):
+            rev._p_oid = b'\0' * 8
+            rev._p_serial = serial
+        self.assertIsNot(html_diff(rev1, rev2), html_diff(rev1, rev2))
+        rev1._p_jar = rev2._p_jar = DummyJar('main')
+        html = html_diff(rev1, rev2)
+        self.assertIs(html_diff(rev1, rev2), html)
+        rev1._p_jar = rev2._p_jar = DummyJar('mounted')
+        self.assertIsNot(html_diff(rev1, rev2), html)
+        rev1._p_jar = rev2._p_jar = DummyJar('main')
+        self.assertIs(html_diff(rev1, rev2), html)
+        rev2._p_serial = b'\0' * 7 + b'\3'
+        self.assertIsNot(html_diff(rev1, rev2), html)
+
+
+class TestSlowCallLog(PythonScriptTestBase):
+
+    def setUp(self):
+        from .. import slowlog
+        PythonScriptTestBase.setUp(self)
+        slowlog.reset()
+
+    def tearDown(self):
+        from .. import slowlog
+        slowlog.configure()
+        PythonScriptTestBase.tearDown(self)
+
+    def _newPS(self, txt, bind=None):
+        ps = PythonScriptTestBase._newPS(self, txt, bind)
+        ps._filepath = 'Script (Python):/ps'
+        return ps
+
+    def testFastCallNotLogged(self):
+        ps = self._newPS('##parameters=a\nreturn a')
+        with self.assertNoLogs('PythonScripts', 'WARNING'):
+            self.assertEqual(ps(1), 1)
+
+    def testScriptThreshold(self):
+        ps = self._newPS('##parameters=a, password, **kw\nreturn a')
+        ps.ZPythonScript_setSlowCallThreshold(1e-6)
+        with self.assertLogs('PythonScripts', 'WARNING') as logs:
+            self.assertEqual(ps('x' * 200, 'secret', token='abc'), 'x' * 200)
+        message = logs.output[0]
+        self.assertIn('Slow call of Script (Python):/ps took', message)
+        self.assertIn("(a='xxx", message)
+        self.assertIn("xxx', password=***, token=***)", message)
+        self.assertNotIn('x' * 100, message)
+        self.assertNotIn('secret', message)
+
+    def testGlobalThreshold(self):
+        ps = self._newPS('return 1')
+        from .. import slowlog
+        with product_config(**{'slow-call-threshold': '0.000001'}):
+            slowlog.configure()
+        with self.assertLogs('PythonScripts', 'WARNING'):
+            ps()
+        slowlog.configure()
+        with self.assertNoLogs('PythonScripts', 'WARNING'):
+            ps()
+
+    def testLargeArguments(self):
+        from .. import slowlog
+
+        class Results:
+            def __len__(self):
+                return 10 ** 6
+
+            def __repr__(self):
+                raise AssertionError('full repr')
+
+        summary = slowlog.summarizeArguments(
+            ('a', 'b', 'c'), (list(range(10 ** 6)), Results(), 'x' * 10 ** 6),
+            {})
+        self.assertIn(', b=<Results of 1000000 items>, ', summary)
+        self.assertRegex(summary, r"c='x+\.\.\.x+'$")
+        self.assertLess(len(summary), 250)
+
+    def testNegativeThreshold(self):
+        ps = self._newPS('return 1')
+        self.assertRaises(ValueError, ps.ZPythonScript_setSlowCallThreshold,
+                          -1)
+
+    def testRateLimit(self):
+        ps = self._newPS('return 1')
+        ps.ZPythonScript_setSlowCallThreshold(1e-6)
+        with self.assertLogs('PythonScripts', 'WARNING') as logs:
+            ps()
+            ps()
+            ps()
+        self.assertEqual(len(logs.output), 1)
+        with product_config(**{'slow-call-log-interval': '0'}):
+            with self.assertLogs('PythonScripts', 'WARNING') as logs:
+                ps()
+        self.assertIn('2 slow calls were not logged', logs.output[0])
+
+    def testErrorsLogged(self):
+        ps = self._newPS('raise ValueError()')
+        ps.ZPythonScript_setSlowCallThreshold(1e-6)
+        with self.assertLogs('PythonScripts', 'WARNING'):
+            self.assertRaises(ValueError, ps)
+
+
+class TestMetrics(PythonScriptTestBase):
+
+    def setUp(self):
+        from .. import metrics
+        PythonScriptTestBase.setUp(self)
+        metrics.enable()
+
+    def tearDown(self):
+        from .. import metrics
+        metrics.disable()
+        metrics.reset()
+        PythonScriptTestBase.tearDown(self)
+
+    def _newPS(self, txt, bind=None):
+        from .. import metrics
+        ps = PythonScript('ps')
+        ps._filepath = 'Script (Python):/ps'
+        ps.ZBindings_edit(bind or {})
+        metrics.reset()
+        ps.write(txt)
+        return ps
+
+    def testCalls(self):
+        from .. import openmetrics
+        ps = self._newPS('##parameters=a\nreturn 1 / a')
+        ps(1)
+        ps(2)
+        self.assertRaises(ZeroDivisionError, ps, 0)
+        text = openmetrics(None)
+        label = '{script="Script (Python):/ps"}'
+        self.assertIn('pythonscripts_calls_total%s 3\n' % label, text)
+        self.assertIn('pythonscripts_errors_total%s 1\n' % label, text)
+        self.assertIn('pythonscripts_compiles_total%s 1\n' % label, text)
+        self.assertIn('pythonscripts_call_duration_seconds_count%s 3\n'
+                      % label, text)
+        self.assertIn('pythonscripts_call_duration_seconds_bucket'
+                      '{script="Script (Python):/ps",le="+Inf"} 3\n', text)
+        self.assertTrue(text.endswith('# EOF\n'))
+
+    def testCache(self):
+        from .. import metrics
+        ps = self._newPS('##parameters=a\nreturn a')
+        cache = {}
+        ps.ZCacheable_isCachingEnabled = lambda: 1
+        ps.ZCacheable_get = lambda keywords, default: cache.get(
+            keywords['*'], default)
+        ps.ZCacheable_set = lambda data, keywords: cache.__setitem__(
+            keywords['*'], data)
+        ps(1)
+        ps(1)
+        ps(2)
+        text = metrics.formatMetrics()
+        label = '{script="Script (Python):/ps"}'
+        self.assertIn('pythonscripts_cache_hits_total%s 1\n' % label, text)
+        self.assertIn('pythonscripts_cache_misses_total%s 2\n' % label, text)
+        self.assertIn('pythonscripts_calls_total%s 2\n' % label, text)
+
+    def testDisabled(self):
+        from .. import metrics
+        metrics.disable()
+        self._newPS('return 1')()
+        self.assertNotIn('script=', metrics.formatMetrics())
+
+    def testContentType(self):
+        from .. import openmetrics
+        request = makerequest(Folder()).REQUEST
+        openmetrics(None, request)
+        self.assertTrue(request.RESPONSE.getHeader('Content-Type')
+                        .startswith('application/openmetrics-text'))
+
+    def testLabelEscaping(self):
+        from .. import metrics
+        metrics.recordCompile('a"b\\c\nd')
+        self.assertIn('{script="a\\"b\\\\c\\nd"} 1',
+                      metrics.formatMetrics())
+
+
+class TestCallTracing(PythonScriptTestBase):
+
+    def setUp(self):
+        from AccessControl.SpecialUsers import system
+
+        from .. import tracing
+        PythonScriptTestBase.setUp(self)
+        newSecurityManager(None, system)
+        tracing.enable()
+
+    def tearDown(self):
+        from .. import tracing
+        tracing.disable()
+        tracing.reset()
+        PythonScriptTestBase.tearDown(self)
+
+    def _folder(self):
+        folder = DummyFolder('folder')
+        for id, body in (
+                ('page', 'return container.item() + container.item()'),
+                ('item', 'return container.format() + 1'),
+                ('format', 'return 1')):
+            ps = self._newPS(body, {'name_container': 'container'})
+            ps.id = id
+            folder._setObject(id, ps)
+        return folder
+
+    def testCallGraph(self):
+        from .. import tracing
+        self.assertEqual(self._folder().page(), 4)
+        stats = tracing.getStatistics()
+        self.assertEqual(sorted(stats), ['page', 'page;item',
+                                         'page;item;format'])
+        self.assertEqual([stats[name][0] for name in sorted(stats)],
+                         [1, 2, 2])
+        for calls, seconds in stats.values():
+            self.assertGreaterEqual(seconds, 0)
+
+    def testNestedTimeExcluded(self):
+        from .. import tracing
+        with tracing.trace('outer'):
+            with tracing.trace('inner'):
+                sum(range(100000))
+        stats = tracing.getStatistics()
+        self.assertLess(stats['outer'][1], stats['outer;inner'][1])
+
+    def testCollapsedExport(self):
+        from .. import call_graph
+        folder = self._folder()
+        folder.item()
+        lines = call_graph(None, reset=1).splitlines()
+        self.assertEqual([line.rsplit(' ', 1)[0] for line in lines],
+                         ['item', 'item;format'])
+        for line in lines:
+            self.assertTrue(line.rsplit(' ', 1)[1].isdigit())
+        self.assertEqual(call_graph(None), '')
+
+    def testDisabled(self):
+        from .. import tracing
+        tracing.disable()
+        self._folder().page()
+        self.assertEqual(tracing.getStatistics(), {})
+
+
+class TestGuardStatistics(PythonScriptTestBase):
+
+    def setUp(self):
+        from .. import instrumentation
+        PythonScriptTestBase.setUp(self)
+        instrumentation.enable()
+
+    def tearDown(self):
+        from .. import instrumentation
+        instrumentation.disable()
+        instrumentation.reset()
+        PythonScriptTestBase.tearDown(self)
+
+    def _callPS(self):
+        ps = self._newPS('l = []\nfor x in [1, 2, 3]:\n    l.append(x)\n'
+                         'return l')
+        ps._filepath = 'Script (Python):/ps'
+        return ps()
+
+    def testStatistics(self):
+        from .. import instrumentation
+        self.assertEqual(self._callPS(), [1, 2, 3])
+        guards, lines = instrumentation.getStatistics()['Script (Python):/ps']
+        self.assertEqual(guards['_getiter_'][0], 1)
+        self.assertEqual(guards['_getattr_'][0], 3)
+        self.assertEqual(lines[2][0], 1)
+        self.assertEqual(lines[3][0], 3)
+
+    def testDisabled(self):
+        from .. import instrumentation
+        instrumentation.disable()
+        self._callPS()
+        self.assertEqual(instrumentation.getStatistics(), {})
+
+    def testReport(self):
+        from .. import guard_statistics
+        self.assertIn('No guard calls', guard_statistics(None))
+        self._callPS()
+        report = guard_statistics(None, reset=1)
+        self.assertIn('Script (Python):/ps\n  _getattr_ ', report)
+        self.assertIn('  line 3 ', report)
+        self.assertIn('No guard calls', guard_statistics(None))
+
+
+class TestRemotePS(PythonScriptTestBase):
+
+    def setUp(self):
+        from ..Extensions import RemotePS
+        PythonScriptTestBase.setUp(self)
+        RemotePS._scripts.clear()
+
+    def testRestrictedExec(self):
+        from ..Extensions.RemotePS import _scripts
+        from ..Extensions.RemotePS import restricted_exec
+        folder = DummyFolder('folder')
+        body = 'return "%s %s %s" % (context.getId(), a, b)'
+        for i in range(3):
+            self.assertEqual(
+                restricted_exec(folder, body, {'b': i, 'a': 'x'}),
+                'folder x %s' % i)
+        self.assertEqual(restricted_exec(folder, 'return 1'), 1)
+        self.assertEqual((len(_scripts), _scripts.hits), (2, 2))
+
+    def testBatch(self):
+        from ..Extensions.RemotePS import restricted_exec_batch
+        self.assertEqual(restricted_exec_batch(DummyFolder('folder'), [
+            'return context.getId()',
+            ['return a * 2', {'a': 21}],
+            ('return a * 2', {'a': 1}),
+        ]), ['folder', 42, 2])
+
+    def testUnauthorized(self):
+        from AccessControl import Unauthorized
+
+        from ..Extensions.RemotePS import restricted_exec
+        self.assertRaises(Unauthorized, restricted_exec, DummyFolder('f'),
+                          'return context.manage_delObjects')
+
+
+class CountingUser:
+    """User with the given proxy roles which counts their checks."""
+
+    def __init__(self, roles=(), denied=()):
+        self.roles = roles
+        self.denied = denied
+        self.checks = 0
+
+    def getId(self):
+        return 'counting'
+
+    def getRolesInContext(self, ob):
+        return ('Authenticated',)
+
+    def allowed(self, ob, roles):
+        if roles is None or 'Manager' in roles:
+            # A permission check.
+            return True
+        self.checks += 1
+        return ob.getId() not in self.denied and \
+            all(role in self.roles for role in roles)
+
+
+class TestProxyRoles(PythonScriptTestBase):
+
+    def _makeFolder(self, *ids):
+        folder = makerequest(DummyFolder('folder'))
+        for id in ids:
+            ps = PythonScript(id)
+            ps.ZBindings_edit({})
+            ps._proxy_roles = ('Owner',)
+            folder._setObject(id, ps)
+        return folder
+
+    def testValidationMemoized(self):
+        user = CountingUser(('Owner',))
+        newSecurityManager(None, user)
+        folder = self._makeFolder('ps')
+        for i in range(3):
+            folder.ps.write('return %s' % i)
+        self.assertEqual(user.checks, 1)
+        # Without a request nothing is kept.
+        aq_base(folder.ps).write('return 3')
+        aq_base(folder.ps).write('return 4')
+        self.assertEqual(user.checks, 3)
+
+    def testForbiddenMemoized(self):
+        user = CountingUser()
+        newSecurityManager(None, user)
+        folder = self._makeFolder('ps')
+        for i in range(2):
+            self.assertRaises(zExceptions.Forbidden, folder.ps.write, '')
+        self.assertEqual(user.checks, 1)
+
+    def testSetProxyRoles(self):
+        from ..PythonScript import setProxyRoles
+        newSecurityManager(None, CountingUser(('Owner', 'Editor')))
+        folder = self._makeFolder('ps1', 'ps2')
+        folder.ps2._proxy_roles = ('Editor',)
+        scripts = [folder.ps1, folder.ps2]
+        self.assertEqual(setProxyRoles(scripts, ['Editor']), 1)
+        self.assertEqual(setProxyRoles(scripts, ['Editor']), 0)
+        self.assertEqual(folder.ps1._proxy_roles, ('Editor',))
+
+    def testSetProxyRolesAllOrNothing(self):
+        from ..PythonScript import setProxyRoles
+        newSecurityManager(None, CountingUser(('Owner',), denied=('ps2',)))
+        folder = self._makeFolder('ps1', 'ps2')
+        folder.ps1._proxy_roles = folder.ps2._proxy_roles = ()
+        self.assertRaises(zExceptions.Forbidden, setProxyRoles,
+                          [folder.ps1, folder.ps2], ('Owner',))
+        self.assertEqual(folder.ps1._proxy_roles, ())
+
+    def testEndpoint(self):
+        from .. import set_proxy_roles
+        newSecurityManager(None, CountingUser(('Owner',)))
+        folder = self._makeFolder('ps1', 'ps2')
+        folder._setObject('sub', DummyFolder('sub'))
+        self.assertRaises(zExceptions.BadRequest, set_proxy_roles, folder)
+        self.assertEqual(folder.ps2._proxy_roles, ('Owner',))
+        self.assertEqual(set_proxy_roles(folder, (), all=1),
+                         'The proxy roles of 2 Scripts were changed.')
+        self.assertEqual(folder.ps2._proxy_roles, ())
+        # A single path or role from a form without :list.
+        self.assertEqual(set_proxy_roles(folder, 'Owner', 'ps1'),
+                         'The proxy roles of 1 Scripts were changed.')
+        self.assertEqual(folder.ps1._proxy_roles, ('Owner',))
+        self.assertRaises(zExceptions.BadRequest, set_proxy_roles,
+                          folder, (), ['sub'])
+        self.assertRaises(zExceptions.BadRequest, set_proxy_roles,
+                          folder, (), ['ps1'], all=1)
+
+
+class TestSignature(PythonScriptTestBase):
+
+    def _newPS(self, params, body='return 1'):
+        ps = PythonScript('ps')
+        ps.ZBindings_edit({})
+        ps.ZPythonScript_edit(params, body)
+        return ps
+
+    def testSignature(self):
+        ps = self._newPS('a, b="x, y", *args, c=(1, 2), **kw')
+        self.assertEqual(ps.signature(), [
+            {'name': 'a', 'kind': 'POSITIONAL_OR_KEYWORD', 'default': None},
+            {'name': 'b', 'kind': 'POSITIONAL_OR_KEYWORD',
+             'default': "'x, y'"},
+            {'name': 'args', 'kind': 'VAR_POSITIONAL', 'default': None},
+            {'name': 'c', 'kind': 'KEYWORD_ONLY', 'default': '(1, 2)'},
+            {'name': 'kw', 'kind': 'VAR_KEYWORD', 'default': None},
+        ])
+        self.assertEqual(ps.ZScriptHTML_tryParams(), ['a', 'b', 'c'])
+
+    def testErrors(self):
+        ps = self._newPS('a, b=1', 'return (')
+        self.assertIsNone(ps.signature())
+        self.assertEqual(ps.ZScriptHTML_tryParams(), ['a', 'b'])
+        ps.ZPythonScript_edit('a', 'return 1')
+        self.assertEqual(ps.ZScriptHTML_tryParams(), ['a'])
+
+    def testCompiledBeforeSignatures(self):
+        ps = self._newPS('a, b=1, *, c=2')
+        del ps._signature
+        self.assertEqual(
+            [(p['name'], p['default']) for p in ps.signature()],
+            [('a', None), ('b', '1'), ('c', None)])
+
+    def testBulk(self):
+        import json
+
+        from .. import signatures
+        folder = DummyFolder('folder')
+        folder._setObject('ps', self._newPS('a'))
+        self.assertEqual(json.loads(signatures(folder)), {'ps': [
+            {'name': 'a', 'kind': 'POSITIONAL_OR_KEYWORD', 'default': None},
+        ]})
+
+
+class TestInventory(PythonScriptTestBase):
+
+    def setUp(self):
+        from OFS.Image import File
+        from ZODB import DB
+        from ZODB.MappingStorage import MappingStorage
+        PythonScriptTestBase.setUp(self)
+        self.db = DB(MappingStorage())
+        connection = self.db.open()
+        folder = DummyFolder('folder')
+        connection.root()['folder'] = folder
+        folder._setObject('sub', Folder('sub'))
+        for container, id, body in (
+                (folder, 'ps1', 'return 1'),
+                (folder, 'ps2', 'return ('),
+                (folder.sub, 'ps3', '##bind context=here\n')):
+            ps = PythonScript(id)
+            ps.write(body)
+            container._setObject(id, ps)
+        folder.ps2._proxy_roles = ('Manager',)
+        folder.sub._setObject('file', File('file', '', b'data'))
+        transaction.commit()
+        connection.cacheMinimize()
+        self.connection = connection
+        self.folder = connection.root()['folder']
+
+    def tearDown(self):
+        transaction.abort()
+        self.connection.close()
+        self.db.close()
+        PythonScriptTestBase.tearDown(self)
+
+    def testInventory(self):
+        import json
+
+        from .. import inventory
+        folder = self.folder
+        folder.ps1.body()
+        lines = b''.join(inventory(folder, batch_size='1')).splitlines()
+        info = sorted((json.loads(line) for line in lines),
+                      key=lambda i: i['path'])
+        self.assertEqual([i['path'] for i in info], ['ps1', 'ps2', 'sub/ps3'])
+        ps1, ps2, ps3 = info
+        self.assertEqual(ps1['content_hash'], folder.ps1.content_hash())
+        self.assertEqual(ps1['size'], len('return 1\n'))
+        self.assertTrue(ps1['compiled'])
+        self.assertEqual((ps2['compiled'], ps2['errors']), (False, 1))
+        self.assertEqual(ps2['proxy_roles'], ['Manager'])
+        self.assertEqual(ps3['bindings']['name_context'], 'here')
+        self.assertIsNone(ps3['cache_manager'])
+
+    def testGhostsDeactivated(self):
+        from ..indexing import iterScripts
+        from ..inventory import iterInventory
+        folder = self.folder
+        folder.ps1.body()
+        self.assertEqual(len(list(iterInventory(iterScripts(folder), 2))), 3)
+        # Only the Scripts loaded for the inventory were deactivated.
+        self.assertIs(folder._getOb('ps1')._p_changed, False)
+        self.assertIsNone(folder._getOb('ps2')._p_changed)
+        self.assertIsNone(folder.sub._getOb('ps3')._p_changed)
+        self.assertIsNone(folder.sub._getOb('file')._p_changed)
+
+    def testSignaturesGhostsDeactivated(self):
+        import json
+
+        from .. import signatures
+        folder = self.folder
+        folder.ps1.body()
+        result = json.loads(signatures(folder, batch_size='2'))
+        self.assertEqual(sorted(result), ['ps1', 'ps2', 'sub/ps3'])
+        self.assertIs(folder._getOb('ps1')._p_changed, False)
+        self.assertIsNone(folder._getOb('ps2')._p_changed)
+        self.assertIsNone(folder.sub._getOb('ps3')._p_changed)
+
+    def testReindexGhostsDeactivated(self):
+        from ..indexing import iterScripts
+        from ..indexing import reindexScripts
+        folder = self.folder
+        folder.ps1.body()
+        catalog = DummyCatalog()
+        self.assertEqual(reindexScripts(catalog, iterScripts(folder), 2),
+                         (3, 0))
+        self.assertIs(folder._getOb('ps1')._p_changed, False)
+        self.assertIsNone(folder._getOb('ps2')._p_changed)
+        self.assertIsNone(folder.sub._getOb('ps3')._p_changed)
+
+
+class TestConcurrentCalls(PythonScriptTestBase):
+    """Many threads calling the same Script must not see each other's
+    bindings or arguments."""
+
+    threads = 8
+    calls = 50
+
+    def setUp(self):
+        PythonScriptTestBase.setUp(self)
+        self._switchinterval = sys.getswitchinterval()
+        # Switch threads as often as possible to provoke interleaving.
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self._switchinterval)
+        PythonScriptTestBase.tearDown(self)
+
+    def _run(self, call):
+        import threading
+        barrier = threading.Barrier(self.threads)
+        results = {}
+        errors = []
+
+        def work(i):
+            newSecurityManager(None, None)
+            try:
+                barrier.wait()
+                results[i] = [call(i) for j in range(self.calls)]
+            except Exception as e:
+                errors.append(e)
+            finally:
+                noSecurityManager()
+
+        workers = [threading.Thread(target=work, args=(i,))
+                   for i in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        return results
+
+    def testBindingIsolation(self):
+        root = DummyFolder('root')
+        root._setObject('ps', PythonScript('ps'))
+        root.ps.write(
+            '##parameters=n, **kw\n'
+            'seen = []\n'
+            'for i in range(20):\n'
+            '    seen.append((context.getId(), container.getId(), n, kw,\n'
+            '                 script.getId()))\n'
+            'return seen\n')
+        for i in range(self.threads):
+            root._setObject(f'f{i}', Folder(f'f{i}'))
+        results = self._run(
+            lambda i: getattr(root, f'f{i}').ps(i, **{f'k{i}': i}))
+        for i, calls in results.items():
+            expected = [(f'f{i}', 'root', i, {f'k{i}': i}, 'ps')] * 20
+            for seen in calls:
+                self.assertEqual(seen, expected)
+
+
 class TestPythonScriptGlobals(PythonScriptTestBase):
 
     def setUp(self):
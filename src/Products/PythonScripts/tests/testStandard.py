@@ -0,0 +1,365 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+import unittest
+
+from AccessControl.SecurityManagement import newSecurityManager
+from AccessControl.SecurityManagement import noSecurityManager
+
+
+class TestDTML(unittest.TestCase):
+
+    def setUp(self):
+        from ..standard import _dtml_cache
+        newSecurityManager(None, None)
+        _dtml_cache.clear()
+
+    def tearDown(self):
+        noSecurityManager()
+
+    def testRender(self):
+        from ..standard import DTML
+        template = DTML('<dtml-var x> and <dtml-var y html_quote>')
+        self.assertEqual(template(x=1, y='<'), '1 and &lt;')
+
+    def testParsedOnce(self):
+        from ..standard import DTML
+        from ..standard import _dtml_cache
+        source = '<dtml-in items>[<dtml-var sequence-item>]</dtml-in>'
+        results = [DTML(source)(items=[i, i + 1]) for i in range(3)]
+        self.assertEqual(results, ['[0][1]', '[1][2]', '[2][3]'])
+        self.assertEqual((_dtml_cache.hits, _dtml_cache.misses), (2, 1))
+        self.assertEqual(len(_dtml_cache), 1)
+        DTML('<dtml-var x>')(x=1)
+        self.assertEqual(len(_dtml_cache), 2)
+
+    def testEviction(self):
+        from ..standard import DTML
+        from ..standard import _dtml_cache
+        size = _dtml_cache.size
+        _dtml_cache.size = 2
+        try:
+            for i in range(3):
+                DTML(f'{i}<dtml-var x>')(x=1)
+            self.assertEqual(len(_dtml_cache), 2)
+            self.assertEqual(DTML('0<dtml-var x>')(x=2), '02')
+            self.assertEqual(_dtml_cache.misses, 4)
+        finally:
+            _dtml_cache.size = size
+
+    def testSecurityContext(self):
+        from AccessControl.SecurityManagement import getSecurityManager
+
+        from ..standard import DTML
+        template = DTML('<dtml-var x>')
+        contexts = []
+
+        def x():
+            contexts.append(getSecurityManager()._context.stack[-1])
+            return 1
+        self.assertEqual(template(x=x), '1')
+        self.assertIs(contexts[0], template)
+        template(x=x)
+        self.assertIs(contexts[1], template)
+
+
+class TestRecords(unittest.TestCase):
+
+    def setUp(self):
+        newSecurityManager(None, None)
+
+    def tearDown(self):
+        noSecurityManager()
+
+    def testRecordType(self):
+        from ..standard import RecordType
+        Row = RecordType('id', 'title')
+        self.assertIs(RecordType('id', 'title'), Row)
+        row = Row(1, title='One')
+        self.assertEqual((row.id, row['title'], row.get('missing', 0)),
+                         (1, 'One', 0))
+        self.assertEqual(Row().items(), [('id', None), ('title', None)])
+        self.assertEqual(repr(row), "Record(id=1, title='One')")
+        self.assertRaises(KeyError, row.__getitem__, 'missing')
+        self.assertRaises(AttributeError, setattr, row, 'other', 1)
+        self.assertFalse(hasattr(row, '__dict__'))
+
+    def testInvalidFields(self):
+        from ..standard import RecordType
+        for fields in (('_id',), ('a b',), ('class',), ('keys',),
+                       ('id', 'id')):
+            self.assertRaises(ValueError, RecordType, *fields)
+
+    def testRecords(self):
+        from ..standard import Records
+        rows = Records(['id', 'title'], [{'id': 1, 'other': 2}, (2, 'Two')])
+        self.assertEqual([row.items() for row in rows],
+                         [[('id', 1), ('title', None)],
+                          [('id', 2), ('title', 'Two')]])
+
+    def testRestrictedCode(self):
+        from ..PythonScript import PythonScript
+        ps = PythonScript('ps')
+        ps.ZBindings_edit({})
+        ps.write(
+            'from Products.PythonScripts.standard import Records\n'
+            'rows = Records(("id", "title"), [(1, "One"), (2, "Two")])\n'
+            'rows[0].title = "First"\n'
+            'return [(row.id, row["title"]) for row in rows]\n')
+        self.assertEqual(ps(), [(1, 'First'), (2, 'Two')])
+
+
+class Vault:
+    """Object whose items and methods restricted code may not use."""
+
+    __roles__ = None
+
+    def keys(self):
+        return ['pin']
+
+    def get(self, key, default=None):
+        return '1234'
+
+    def __getitem__(self, key):
+        return '1234'
+
+    def __iter__(self):
+        return iter(['1234'])
+
+
+class Secret:
+    """Object which restricted code may not use at all."""
+
+    __roles__ = ()
+
+
+class TestProtectedValues(unittest.TestCase):
+
+    def setUp(self):
+        newSecurityManager(None, None)
+
+    def tearDown(self):
+        noSecurityManager()
+
+    def _call(self, expr, vault=None):
+        from AccessControl import Unauthorized
+
+        from ..PythonScript import PythonScript
+        ps = PythonScript('ps')
+        ps.ZBindings_edit({})
+        ps.write('##parameters=vault\n'
+                 'from Products.PythonScripts import standard\n'
+                 'return %s\n' % expr)
+        self.assertRaises(Unauthorized, ps, vault or Vault())
+
+    def testRecords(self):
+        self._call('standard.Records(("pin",), [vault])')
+        self._call('standard.Records(("pin",), vault)')
+
+    def testBatchFormatting(self):
+        self._call('standard.html_quote_each(vault)')
+        self._call('list(standard.iter_formatted("html_quote", vault))')
+
+    def testStream(self):
+        self._call('standard.stream(None, vault)')
+
+    def testGenerators(self):
+        # Generators of trusted code are checked item by item as well.
+        def secrets():
+            yield Secret()
+
+        for expr in ('standard.Records(("pin",), vault)',
+                     'standard.html_quote_each(vault)',
+                     'list(standard.iter_formatted("html_quote", vault))',
+                     'standard.stream(None, vault)'):
+            self._call(expr, secrets())
+
+
+class TestBatchFormatting(unittest.TestCase):
+
+    values = [0, 7, -1234, 1234567, 12345.678, 1e20, True, None, '',
+              'a <b> & "c"', 'ä ö/?=&+', b'x y', "it's", '1234567.891']
+
+    def testSameAsSingleValueFunctions(self):
+        from .. import standard
+        for name in ('whole_dollars', 'dollars_and_cents',
+                     'thousands_commas', 'html_quote', 'url_quote',
+                     'url_quote_plus', 'sql_quote'):
+            single = getattr(standard, name)
+            values = self.values
+            if name == 'sql_quote':
+                values = [v for v in values if isinstance(v, (str, bytes))]
+            expected = [single(v) for v in values]
+            self.assertEqual(getattr(standard, name + '_each')(values),
+                             expected, name)
+            self.assertEqual(list(standard.iter_formatted(name, values)),
+                             expected, name)
+
+    def testIterFormattedIsLazy(self):
+        from ..standard import iter_formatted
+
+        def values():
+            yield 1000
+            raise AssertionError('consumed')
+        self.assertEqual(next(iter_formatted('thousands_commas', values())),
+                         '1,000')
+
+    def testUnknownFormat(self):
+        from ..standard import iter_formatted
+        self.assertRaises(ValueError, iter_formatted, 'structured_text', [])
+
+    def testRestrictedCode(self):
+        from ..PythonScript import PythonScript
+        newSecurityManager(None, None)
+        try:
+            ps = PythonScript('ps')
+            ps.ZBindings_edit({})
+            ps.write(
+                '##parameters=values\n'
+                'from Products.PythonScripts import standard\n'
+                'quoted = standard.html_quote_each(values)\n'
+                'return quoted, [v for v in standard.iter_formatted('
+                '"url_quote", values)]\n')
+            self.assertEqual(ps(['<a>', 'b c']),
+                             (['&lt;a&gt;', 'b c'], ['%3Ca%3E', 'b%20c']))
+        finally:
+            noSecurityManager()
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        newSecurityManager(None, None)
+
+    def tearDown(self):
+        noSecurityManager()
+
+    def _makeResponse(self):
+        from io import BytesIO
+
+        from ZPublisher.HTTPResponse import WSGIResponse
+        return WSGIResponse(stdout=BytesIO(), stderr=BytesIO())
+
+    def testStream(self):
+        from ZPublisher.Iterators import IStreamIterator
+
+        from ..standard import stream
+        from .testPythonScript import product_config
+
+        def rows():
+            for i in range(3000):
+                yield f'{i},ä\n'
+        response = self._makeResponse()
+        with product_config(**{'stream-spool-size': '1024'}):
+            body = stream(response, rows(), 'text/csv', 'export ä.csv')
+        self.assertTrue(IStreamIterator.providedBy(body))
+        self.assertTrue(body._file._rolled)
+        data = b''.join(body)
+        self.assertEqual(data, ''.join(rows()).encode('utf-8'))
+        self.assertEqual(len(body), len(data))
+        self.assertTrue(body._file.closed)
+        self.assertEqual(response.getHeader('Content-Type'),
+                         'text/csv; charset=utf-8')
+        self.assertEqual(response.getHeader('Content-Length'),
+                         str(len(data)))
+        self.assertEqual(response.getHeader('Content-Disposition'),
+                         "attachment; filename*=UTF-8''export%20%C3%A4.csv")
+
+        response.setBody(body)
+        self.assertIs(response.body, body)
+
+    def testInvalidChunks(self):
+        from ..standard import stream
+        self.assertRaises(TypeError, stream, None, ['a', 1])
+
+    def testRestrictedCode(self):
+        from ..PythonScript import PythonScript
+        ps = PythonScript('ps')
+        ps.ZBindings_edit({})
+        ps.write(
+            '##parameters=RESPONSE\n'
+            'from Products.PythonScripts.standard import stream\n'
+            'def lines():\n'
+            '    for i in range(3):\n'
+            '        yield "%s\\n" % i\n'
+            'return stream(RESPONSE, lines(), "text/plain")\n')
+        response = self._makeResponse()
+        self.assertEqual(b''.join(ps(response)), b'0\n1\n2\n')
+        self.assertEqual(response.getHeader('Content-Type'),
+                         'text/plain; charset=utf-8')
+
+
+class TestJSON(unittest.TestCase):
+
+    def setUp(self):
+        newSecurityManager(None, None)
+
+    def tearDown(self):
+        noSecurityManager()
+
+    def testDumps(self):
+        import datetime
+
+        from DateTime.DateTime import DateTime
+
+        from ..standard import Object
+        from ..standard import Records
+        from ..standard import json_dumps
+        value = {
+            'date': DateTime('2026-10-19 12:30:00 GMT+0'),
+            'day': datetime.date(2026, 10, 19),
+            'object': Object(a=1, b=['x', None]),
+            'records': Records(('id', 'title'), [(1, 'ä "q"')]),
+            'tuple': (1.5, True),
+        }
+        self.assertEqual(json_dumps(value, sort_keys=True), (
+            '{"date": "2026-10-19T12:30:00+00:00", "day": "2026-10-19", '
+            '"object": {"a": 1, "b": ["x", null]}, '
+            '"records": [{"id": 1, "title": "\\u00e4 \\"q\\""}], '
+            '"tuple": [1.5, true]}'))
+
+    def testRefusesOtherObjects(self):
+        from ..PythonScript import PythonScript
+        from ..standard import json_dumps
+        self.assertRaises(TypeError, json_dumps, [PythonScript('ps')])
+
+    def testIterencode(self):
+        from ..standard import json_dumps
+        from ..standard import json_iterencode
+        from ..standard import json_loads
+        value = [{'id': i, 'title': 'Item %s' % i} for i in range(10000)]
+        chunks = list(json_iterencode(value))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(''.join(chunks), json_dumps(value))
+        self.assertEqual(json_loads(''.join(chunks)), value)
+
+    def testRestrictedCode(self):
+        from io import BytesIO
+
+        from ZPublisher.HTTPResponse import WSGIResponse
+
+        from ..PythonScript import PythonScript
+        ps = PythonScript('ps')
+        ps.ZBindings_edit({})
+        ps.write(
+            '##parameters=RESPONSE, text\n'
+            'from Products.PythonScripts import standard\n'
+            'rows = standard.json_loads(text)\n'
+            'rows.append(standard.Object(id=3))\n'
+            'return standard.stream(RESPONSE, standard.json_iterencode('
+            'rows), "application/json")\n')
+        response = WSGIResponse(stdout=BytesIO(), stderr=BytesIO())
+        body = ps(response, '[{"id": 1}, {"id": 2}]')
+        self.assertEqual(b''.join(body),
+                         b'[{"id": 1}, {"id": 2}, {"id": 3}]')
+        self.assertEqual(response.getHeader('Content-Type'),
+                         'application/json')
@@ -0,0 +1,101 @@
+##############################################################################
+#
+# Copyright (c) 2026 Zope Foundation and Contributors.
+#
+# This software is subject to the provisions of the Zope Public License,
+# Version 2.1 (ZPL).  A copy of the ZPL should accompany this distribution.
+# THIS SOFTWARE IS PROVIDED "AS IS" AND ANY AND ALL EXPRESS OR IMPLIED
+# WARRANTIES ARE DISCLAIMED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF TITLE, MERCHANTABILITY, AGAINST INFRINGEMENT, AND FITNESS
+# FOR A PARTICULAR PURPOSE
+#
+##############################################################################
+"""Call graph tracing of Scripts calling Scripts
+
+When enabled, every Script call is recorded together with the chain of
+Script calls it was made from.  The chain is kept in a context variable,
+so it follows the calls within one request or thread.  The time spent
+in each chain, without the time of the nested Script calls, is exported
+in the collapsed stack format read by flame graph tools, e.g.::
+
+  /site/page;/site/get_items;/site/format_item 1234
+
+where the number is the time in microseconds.
+"""
+
+import contextlib
+import contextvars
+import threading
+from time import perf_counter
+
+
+enabled = False
+_lock = threading.Lock()
+_stacks = {}  # {call chain: [calls, seconds]}
+_current = contextvars.ContextVar('pythonscripts_call', default=None)
+
+
+class _Frame:
+
+    __slots__ = ('stack', 'children')
+
+    def __init__(self, stack):
+        self.stack = stack
+        self.children = 0.0
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    with _lock:
+        _stacks.clear()
+
+
+@contextlib.contextmanager
+def trace(name):
+    """Record the code run in the with block as a call of name."""
+    parent = _current.get()
+    # Frame separators in names would break the collapsed format.
+    name = name.replace(';', ':')
+    if parent is None:
+        frame = _Frame(name)
+    else:
+        frame = _Frame(f'{parent.stack};{name}')
+    token = _current.set(frame)
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start
+        _current.reset(token)
+        if parent is not None:
+            parent.children += elapsed
+        with _lock:
+            stats = _stacks.setdefault(frame.stack, [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed - frame.children
+
+
+def getStatistics():
+    """Return ``{call chain: (calls, seconds)}``.
+
+    The call chain is a string of names separated by semicolons and the
+    seconds do not include the time of nested calls.
+    """
+    with _lock:
+        return {stack: tuple(stats) for stack, stats in _stacks.items()}
+
+
+def formatCollapsed():
+    """Return the statistics in the collapsed stack format."""
+    return ''.join(f'{stack} {round(seconds * 1e6)}\n'
+                   for stack, (calls, seconds)
+                   in sorted(getStatistics().items()))